@@ -0,0 +1 @@
+"""Benchmarks for miscutils. Run a module with ``python -m bench.<name>``."""
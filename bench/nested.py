@@ -0,0 +1,247 @@
+"""nested - benchmark suite for the ``nested`` module
+
+Measures the overhead of ``get``, ``set``, ``update`` and ``delete`` across
+path depths and accessor mixes, for string paths (through the path cache),
+cold string paths (with the path cache emptied before every call, so they
+are parsed and compiled again) and compiled paths, compared against the
+equivalent hand-written Python expression.
+
+Results are written as JSON. Passing a previous results file with
+``--compare`` reports any case that got slower than ``--threshold`` and
+exits with status 1, so regressions can be caught before a release.
+
+Usage::
+
+    python -m bench.nested [--output FILE] [--compare FILE] [--quick]
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from miscutils import nested
+
+DEPTHS = (1, 4, 8, 12)
+
+# Each mix is a cycle of accessor kinds used to build paths of any depth
+MIXES = {
+    "key": ("key",),
+    "attr": ("attr",),
+    "index": ("index",),
+    "slots": ("slots",),
+    "dataclass": ("dataclass",),
+    "mixed": ("key", "attr", "index"),
+}
+
+OPERATIONS = ("get", "set", "update", "delete")
+
+
+class Slotted:
+    __slots__ = ("child",)
+
+    def __init__(self, child):
+        self.child = child
+
+
+@dataclass
+class Record:
+    child: object
+
+
+def build_case(mix, depth):
+    """Return ``(make_data, path, expr)`` for a mix of accessors and depth.
+
+    ``make_data()`` builds a fresh structure, ``path`` reaches its leaf and
+    ``expr`` is the equivalent hand-written Python expression on ``obj``.
+    """
+    kinds = [MIXES[mix][i % len(MIXES[mix])] for i in range(depth)]
+    path = []
+    expr = "obj"
+    for kind in kinds:
+        if kind == "key":
+            path.append("[child]")
+            expr += '["child"]'
+        elif kind == "index":
+            path.append("#1")
+            expr += "[1]"
+        else:
+            path.append(".child")
+            expr += ".child"
+
+    def make_data():
+        value = 0
+        for kind in reversed(kinds):
+            if kind == "key":
+                value = {"child": value, "other": None}
+            elif kind == "index":
+                value = [None, value]
+            elif kind == "attr":
+                value = SimpleNamespace(child=value, other=None)
+            elif kind == "slots":
+                value = Slotted(value)
+            else:
+                value = Record(value)
+        return value
+
+    return make_data, "".join(path), expr
+
+
+def operations(path, expr):
+    """Return ``{(operation, variant): (stmt, needs_fresh_data)}``."""
+    compiled = nested.compile(path)
+    namespace = {"nested": nested, "path": path, "compiled": compiled}
+    hand_get = eval(f"lambda obj: {expr}", namespace)  # noqa: S307
+    exec(  # noqa: S102
+        f"def hand_set(obj, value):\n    {expr} = value\n"
+        f"def hand_delete(obj):\n    del {expr}\n",
+        namespace,
+    )
+    return {
+        ("get", "string"): (lambda obj: nested.get(obj, path), False),
+        ("get", "cold"): (_cold(nested.get, path), False),
+        ("get", "compiled"): (compiled.get, False),
+        ("get", "hand"): (hand_get, False),
+        ("set", "string"): (lambda obj: nested.set(obj, path, 1), False),
+        ("set", "cold"): (_cold(nested.set, path, 1), False),
+        ("set", "compiled"): (lambda obj: compiled.set(obj, 1), False),
+        ("set", "hand"): (lambda obj: namespace["hand_set"](obj, 1), False),
+        ("update", "string"): (
+            lambda obj: nested.update(obj, path, _increment),
+            False,
+        ),
+        ("update", "cold"): (_cold(nested.update, path, _increment), False),
+        ("update", "compiled"): (
+            lambda obj: compiled.update(obj, _increment),
+            False,
+        ),
+        ("update", "hand"): (
+            lambda obj: namespace["hand_set"](obj, hand_get(obj) + 1),
+            False,
+        ),
+        ("delete", "string"): (lambda obj: nested.delete(obj, path), True),
+        ("delete", "cold"): (_cold(nested.delete, path), True),
+        ("delete", "compiled"): (compiled.delete, True),
+        ("delete", "hand"): (namespace["hand_delete"], True),
+    }
+
+
+def _cold(function, path, *args):
+    """Return a call of ``function`` that compiles ``path`` from scratch."""
+
+    def call(obj):
+        nested.cache_clear()
+        return function(obj, path, *args)
+
+    return call
+
+
+def _increment(node):
+    return node.value + 1
+
+
+def measure(func, make_data, fresh, number, repeat):
+    """Return the best time per call of ``func``, in nanoseconds."""
+    if fresh:
+        # Destructive operations need new data for every call, so build all
+        # of it up front and time only the calls.
+        datas = [[make_data() for _ in range(number)] for _ in range(repeat)]
+        best = float("inf")
+        for batch in datas:
+            start = timeit.default_timer()
+            for data in batch:
+                func(data)
+            best = min(best, timeit.default_timer() - start)
+        return best / number * 1e9
+
+    data = make_data()
+    timer = timeit.Timer(lambda: func(data))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run(number, repeat):
+    results = {}
+    for mix in MIXES:
+        for depth in DEPTHS:
+            make_data, path, expr = build_case(mix, depth)
+            for (operation, variant), (func, fresh) in operations(
+                path, expr
+            ).items():
+                key = f"{operation}/{mix}/{depth}/{variant}"
+                results[key] = measure(func, make_data, fresh, number, repeat)
+    return results
+
+
+def compare(results, previous, threshold):
+    """Print the cases slower than ``threshold`` and return their count."""
+    regressions = 0
+    for key, time in sorted(results.items()):
+        old = previous.get(key)
+        if old and time > old * (1 + threshold):
+            regressions += 1
+            print(f"REGRESSION {key}: {old:.0f}ns -> {time:.0f}ns")
+    return regressions
+
+
+VARIANTS = ("string", "cold", "compiled", "hand")
+
+
+def report(results):
+    print(f"{'case':<28}" + "".join(f" {name:>9}" for name in VARIANTS))
+    cases = sorted(
+        {key.rpartition("/")[0] for key in results},
+        key=lambda case: _case_sort_key(case.split("/")),
+    )
+    for case in cases:
+        times = (results[f"{case}/{variant}"] for variant in VARIANTS)
+        print(f"{case:<28}" + "".join(f" {time:>8.0f}n" for time in times))
+
+
+def _case_sort_key(parts):
+    operation, mix, depth = parts
+    return OPERATIONS.index(operation), mix, int(depth)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="file to write JSON results to")
+    parser.add_argument("--compare", help="previous JSON results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative slowdown reported as a regression (default: 0.15)",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="fewer iterations, for smoke runs"
+    )
+    args = parser.parse_args(argv)
+
+    number, repeat = (200, 2) if args.quick else (5000, 5)
+    results = run(number, repeat)
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                handle,
+                indent=2,
+                sort_keys=True,
+            )
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)["results"]
+        if compare(results, previous, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
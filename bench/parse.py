@@ -0,0 +1,131 @@
+"""parse - micro-benchmark for ``nested.parse_actions``
+
+Compares the parse time per path length of the current regex-tokenizing
+``parse_actions`` with the original char-by-char implementation, which is
+kept below for reference.
+
+Usage::
+
+    python -m bench.parse [--number N]
+"""
+import argparse
+import timeit
+
+from miscutils import nested
+from miscutils.nested import (
+    LHS_OPS,
+    OP_CHARS,
+    RHS_OPS,
+    MissingLHSOperator,
+    MissingRHSOperator,
+    MissingValueChar,
+    UnexpectedRHSOperator,
+    make_action,
+)
+
+ACCESSORS = ("[key]", ".attr", "#12")
+LENGTHS = (1, 2, 4, 8, 16, 32)
+
+
+def legacy_parse_actions(path):
+    """The original implementation of ``nested.parse_actions``."""
+    actions = []
+    accessor = None
+    item = ""
+
+    for char in path:
+        # Grab the operator if this char is an lhs operator char
+        lhs_op = LHS_OPS.get(char)
+
+        if accessor is None:
+            # If no current accessor, assert that char is an lhs operator
+            if not lhs_op:
+                raise MissingLHSOperator(char)
+
+            # Assign the new operator
+            accessor = lhs_op
+        else:
+            # If char is not an operator char, append it to current value
+            if char not in OP_CHARS:
+                item += char
+
+                continue
+
+            # Otherwise, translate current op into action
+            actions.append(make_action(item, accessor))
+            item = ""
+
+            # If the current op expects a rhs op char...
+            rhs_op_char = RHS_OPS.get(accessor)
+
+            if rhs_op_char:
+                # ...raise error if the current char is an lhs op char
+                if lhs_op:
+                    raise MissingRHSOperator(accessor, char)
+
+                # ...clear current op if current char is the rhs op char
+                if char == rhs_op_char:
+                    accessor = None
+
+                continue
+
+            # Else if the current op has no rhs op char...
+            if lhs_op:
+                # ...if current char is an lhs op char, start new accessor
+                accessor = lhs_op
+            else:
+                # ...otherwise it's a misplaced rhs op char, so raise error
+                raise UnexpectedRHSOperator(char)
+
+    # Process final accessor if it had no rhs op char
+    if accessor is not None:
+        # Raise an error if no value was present
+        if not item:
+            raise MissingValueChar(accessor)
+
+        # Raise an error if op expects a rhs op char
+        if accessor in RHS_OPS:
+            for char, op in LHS_OPS.items():
+                if op is accessor:
+                    raise MissingRHSOperator(accessor, char)
+
+        # Translate final accessor into action
+        actions.append(make_action(item, accessor))
+
+    return actions
+
+
+def make_path(length):
+    return "".join(ACCESSORS[i % len(ACCESSORS)] for i in range(length))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'accessors':>9}  {'legacy (us)':>11}  {'tokenizer (us)':>14}"
+        "  speedup"
+    )
+    for length in LENGTHS:
+        path = make_path(length)
+        assert legacy_parse_actions(path) == nested.parse_actions(path)
+        legacy, current = (
+            min(
+                timeit.repeat(
+                    lambda: parse(path), number=args.number, repeat=3
+                )
+            )
+            / args.number
+            * 1e6
+            for parse in (legacy_parse_actions, nested.parse_actions)
+        )
+        print(
+            f"{length:>9}  {legacy:>11.2f}  {current:>14.2f}"
+            f"  {legacy / current:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,65 @@
 """nested - tools for working with arbitrarily nested data structures
 
-This module exports three functions and some accompanying Exception classes.
-It's overall purpose is to facillitate working with deeply nested attributes
-on various types of objects in an easy way.
+This module exports the functions and classes listed below, along with some
+accompanying Exception classes. It's overall purpose is to facillitate working
+with deeply nested attributes on various types of objects in an easy way.
 
 API
 ---
 
 * ``get(obj, path)`` retrieves a nested value.
-* ``set(obj, path, value)`` replaces a nested value with a new value.
+* ``set(obj, path, value)`` replaces a nested value with a new value. With
+    ``create=True``, missing intermediate containers are created on the way.
 * ``update(obj, path, transform)`` calls a function on a nested value and
     sets it to the return value.
+* ``delete(obj, path)`` deletes a nested value.
+* ``first(obj, path)`` retrieves the first match of a path with a wildcard
+    or filter, without visiting the rest.
+* ``exists(obj, path)`` checks whether a nested value exists, without raising
+    and catching exceptions internally, and reports where the lookup failed.
+* ``get_many(obj, paths)`` retrieves several nested values at once, sharing
+    the traversal of common path prefixes.
+* ``pluck(records, path)`` lazily retrieves a nested value from each of
+    many records, and ``pluck_many(records, paths)`` retrieves several.
+* ``aget(obj, path)`` and ``aget_many(obj, paths)`` are coroutine versions
+    of ``get`` and ``get_many`` that await any awaitable met during the
+    traversal, resolving independent branches concurrently.
+* ``projector(spec)`` compiles a reshaping spec into a callable that builds
+    a new structure from nested values of its argument.
+* ``apply(obj, ops)`` applies a batch of writes as a single transaction,
+    rolling them all back if any of them fails.
+* ``diff(old, new)`` yields the minimal operations that turn ``old`` into
+    ``new``, and ``patch(obj, ops)`` applies them.
+* ``walk(obj)`` yields a ``DataNode`` for every node in ``obj``, depth-first
+    or breadth-first, optionally skipping subtrees.
+* ``flatten(obj)`` yields a ``(path, value)`` pair for each leaf in ``obj``,
+    and ``unflatten(pairs)`` builds the structure back from them.
+* ``assoc(obj, path, value)``, ``dissoc(obj, path)`` and
+    ``update_in(obj, path, transform)`` are non-mutating versions of ``set``,
+    ``delete`` and ``update`` that copy only the containers along ``path``.
+* ``track(obj)`` wraps ``obj`` in a proxy that records the path of every
+    change made through it.
+* ``PathIndex(obj)`` indexes every node in ``obj`` by path for repeated
+    constant-time lookups.
+* ``compile(path)`` parses a path once into a reusable ``CompiledPath``.
+
+Paths are also used by ``miscutils.nested_json.stream_get``, which retrieves
+nested values from a JSON document without loading all of it, and all of the
+functions above work on a ``miscutils.nested_lazy.LazyDocument``, whose nodes
+are loaded from a key-value store on demand. ``miscutils.nested_pool``
+updates many records at once over a pool of processes.
+
+Paths given as strings to the functions above are compiled on first use and
+kept in a bounded LRU cache, so repeated calls with the same path string skip
+parsing entirely. Use ``cache_info()`` to inspect the cache's hit and miss
+counters and ``cache_clear()`` to empty it. A compiled path only generates
+specialized code once it has been used ``SPECIALIZE_THRESHOLD`` times, so
+paths that are used only a few times don't pay for it.
+
+To find out which path strings are hot, call ``enable_profiling()``. While
+it is on, ``get``, ``set``, ``update`` and ``delete`` count the calls and
+time spent on each path string, and specialize a path once it reaches the
+profiling threshold instead. ``stats()`` reports what has been recorded.
 
 The ``path`` parameter on each function takes a string which specifies how to
 reach the desired value. This mini-DSL is described below.
@@ -24,9 +73,20 @@ The syntax of the path DSL is:
 
     path            ::=  accessor [accessor [accessor ...]]
     accessor        ::=  lhs_operator parameter [rhs_operator]
+                         | "[?" filter "]"
     lhs_operator    ::=  "." | "[" | "#"
     rhs_operator    ::=  "]"
-    parameter       ::=  string
+    parameter       ::=  bare | quoted | wildcard | slice | tuple
+    bare            ::=  (char | escape) [(char | escape) ...]
+    quoted          ::=  quote [char | escape ...] quote
+    quote           ::=  '"' | "'"
+    escape          ::=  "\\" anychar
+    wildcard        ::=  "*"
+    slice           ::=  [integer] ":" [integer] [":" [integer]]
+    tuple           ::=  (integer | slice) "," [(integer | slice) ...]
+    filter          ::=  operand [comparison literal]
+    operand         ::=  "@" | bare | path
+    comparison      ::=  "==" | "!=" | "<" | "<=" | ">" | ">="
 
 A ``path`` is just a sequence of alternating operators and parameters, where
 each operator describe how to access each parameter. These pairs form a
@@ -42,27 +102,160 @@ Name          Syntax                         Parameter  Python executed
 ============  =============================  =========  ===============
 attr          `"." parameter`                string     `getattr(obj, param)`
 key           `"[" parameter "]"`            string     `obj[param]`
-index         `"#" parameter`                integer    `obj[param]`
+index         `"#" parameter`                integer    `obj[int(param)]`
 ============  =============================  =========  ===============
+
+A bare parameter can't contain any of the operator chars ``.[]#``, but a
+parameter can be quoted to include them (``["a.b"]``), and any char can be
+escaped with a backslash (``[a\\.b]``). Use ``format_path()`` to turn actions
+back into a path string with quoting applied where needed. INDEX parameters
+may be negative.
+
+An INDEX parameter can also be a slice, like ``#10:20`` or ``#::2``, or a
+tuple of integers and slices, like ``#3,4`` (or ``#3,`` for a 1-tuple), for
+containers whose ``__getitem__`` takes tuples. Reading a slice doesn't copy
+it: ``bytes``, ``bytearray``, ``array.array`` and ``memoryview`` objects give
+a ``memoryview``, lists and tuples give a ``miscutils.views.ListView``, and
+anything else is sliced as usual (see ``slice_view()``). Setting a slice
+assigns to it, as in ``obj[10:20] = value``. ``update`` passes the transform
+a copy of a buffer slice instead, so that it can change the slice's length.
+
+Any accessor can take the wildcard ``*`` as its parameter, which fans out to
+every match: ``.*`` matches every instance attribute, ``[*]`` every key of a
+mapping and ``#*`` every index of a sequence. For example,
+``[items]#*[price]`` matches the price of every item. When a path contains a
+wildcard, ``get`` returns a lazy generator of ``DataNode`` objects (one per
+match) and ``set``, ``update`` and ``delete`` apply to every match in a single
+traversal.
+
+A filter ``[?operand op literal]`` fans out to every child (attr, key or
+index, like ``children()``) that passes a test, such as
+``[orders][?status=="open"][total]``. The operand is ``@`` for the child
+itself, a bare key name, or a path into the child, and the literal is any
+Python literal. Without an op, ``[?operand]`` tests the operand for truth.
+Filters are compiled along with the path and evaluated lazily, and
+``first()`` stops at the first match.
 """
-from collections import OrderedDict, namedtuple
+import array
+import ast
+import asyncio
+import builtins
+import copy
+import dataclasses
+import inspect
+import itertools
+import re
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import (
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Sequence,
+)
 from enum import Enum
+from functools import lru_cache, partial
+from keyword import iskeyword
+from operator import attrgetter, eq, ge, gt, itemgetter, le, lt, ne
+from time import perf_counter
+from types import SimpleNamespace
+
+from miscutils.views import ListView
 
 __all__ = [
     "get",
     "set",
     "update",
+    "delete",
+    "exists",
+    "first",
+    "get_many",
+    "pluck",
+    "pluck_many",
+    "aget",
+    "aget_many",
+    "projector",
+    "apply",
+    "diff",
+    "patch",
+    "walk",
+    "flatten",
+    "unflatten",
+    "track",
+    "assoc",
+    "dissoc",
+    "update_in",
+    "compile",
+    "format_path",
+    "cache_info",
+    "cache_clear",
+    "enable_profiling",
+    "disable_profiling",
+    "stats",
+    "CompiledPath",
+    "PathIndex",
+    "Projector",
     "DataNode",
+    "Lookup",
+    "PathStats",
+    "Slice",
     "MissingRHSOperator",
     "MissingLHSOperator",
     "UnexpectedRHSOperator",
     "MissingValueChar",
+    "UnterminatedQuote",
+    "InvalidIndex",
+    "InvalidFilter",
 ]
 
 DataNode = namedtuple("DataNode", "value action parent")
 
+
+class PathStats(namedtuple("PathStats", "path calls state time")):
+    """Profile of a path string, as returned by ``stats()``.
+
+    Attributes:
+        path (str): The path string.
+        calls (int): The number of profiled calls made with the path.
+        state (str): ``"interpreted"`` if the path is still executed action
+            by action, or ``"specialized"`` once it has been promoted to
+            generated code.
+        time (float): Cumulative time spent in those calls, in seconds.
+    """
+
+    __slots__ = ()
+
+
+class Lookup(namedtuple("Lookup", "node depth failed")):
+    """Report of a non-raising path lookup, as returned by ``exists()``.
+
+    A report is truthy if the target was found.
+
+    Attributes:
+        node (DataNode): The target's node if it was found. Otherwise, the
+            node of the deepest object that was reached.
+        depth (int): The number of actions that succeeded.
+        failed (Action): The action that failed, or None if it was found.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.failed is None
+
+
 Action = namedtuple("Action", "item accessor")
 
+
+class Slice(namedtuple("Slice", "start stop step", defaults=(None,))):
+    """INDEX action item for a slice, such as ``#10:20`` or ``#::2``.
+
+    Unlike ``slice`` objects, these are hashable, like every other action
+    item. ``slice(*item)`` gives the slice itself.
+    """
+
+    __slots__ = ()
+
+
 Accessor = Enum("Accessor", "ATTR KEY INDEX")
 
 LHS_OPS = OrderedDict(
@@ -71,9 +264,229 @@ LHS_OPS = OrderedDict(
 RHS_OPS = OrderedDict(((Accessor.KEY, "]"),))
 
 OP_CHARS = [*LHS_OPS.keys(), *RHS_OPS.values()]
+RHS_OP_CHARS = frozenset(RHS_OPS.values())
+
+QUOTE_CHARS = "\"'"
+QUOTED_PARAM = re.compile(r"""(["'])((?:\\.|(?!\1).)*)\1""", re.DOTALL)
+BARE_PARAM = re.compile(r"""(?:\\.|[^.\[\]#\\])+""", re.DOTALL)
+EMPTY_PARAM = re.compile(r"(?=\])")
+ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+NEEDS_QUOTES = re.compile(r"""[.\[\]#\\]|^["'?]""")
+
+
+class _Wildcard:
+    """Action item that matches every attr, key or index of an object."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "WILDCARD"
+
+    def __reduce__(self):
+        return "WILDCARD"
+
+
+WILDCARD = _Wildcard()
+WILDCARD_CHAR = "*"
+
+QUOTED_STRING = r"""(?:"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+FILTER_BODY = (
+    rf"""(?:{QUOTED_STRING}|\[(?:{QUOTED_STRING}|[^\]"'])*\]|[^\[\]"'])+"""
+)
+FILTER_PARAM = re.compile(rf"\?({FILTER_BODY})")
+# A quoted parameter, with its quote char captured in group ``quote``
+QUOTED_TOKEN = r"""(?: (?P<{quote}> ["'] )
+    (?P<{name}> (?: \\. | (?! (?P={quote}) ). )* ) (?P={quote}) )"""
+# A bare parameter, which can't start with a quote (or ``extra``)
+BARE_TOKEN = r"""(?: \\. | [^.\[\]#\\"'{extra}] ) (?: \\. | [^.\[\]#\\] )*"""
+
+# A single accessor, with the parameter in a group named for its kind
+PATH_TOKEN = re.compile(
+    rf"""
+    \[ (?:
+        \? (?P<filter> {FILTER_BODY} )
+        | {QUOTED_TOKEN.format(quote="key_quote", name="quoted_key")}
+        | (?P<key> (?: {BARE_TOKEN.format(extra="?")} )? )
+    ) \]
+    | \. (?:
+        {QUOTED_TOKEN.format(quote="attr_quote", name="quoted_attr")}
+        | (?P<attr> {BARE_TOKEN.format(extra="")} )
+    )
+    | \# (?:
+        {QUOTED_TOKEN.format(quote="index_quote", name="quoted_index")}
+        | (?P<index> {BARE_TOKEN.format(extra="")} )
+    )
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# The accessor and quoting of the parameter in each group of ``PATH_TOKEN``
+PATH_TOKEN_KINDS = {
+    PATH_TOKEN.groupindex[name]: kind
+    for name, kind in (
+        ("filter", (Accessor.KEY, False)),
+        ("quoted_key", (Accessor.KEY, True)),
+        ("key", (Accessor.KEY, False)),
+        ("quoted_attr", (Accessor.ATTR, True)),
+        ("attr", (Accessor.ATTR, False)),
+        ("quoted_index", (Accessor.INDEX, True)),
+        ("index", (Accessor.INDEX, False)),
+    )
+}
+FILTER_GROUP = PATH_TOKEN.groupindex["filter"]
+
+# Paths without quotes, escapes or filters (most of them) are tokenized by
+# this simpler and faster regex instead, with one group per accessor
+PLAIN_PATH_TOKEN = re.compile(
+    r"""\[([^.\[\]#\\"'?]*)\]|\.([^.\[\]#\\"']+)|#([^.\[\]#\\"']+)"""
+)
+PLAIN_PATH_TOKEN_ACCESSORS = (
+    None,
+    Accessor.KEY,
+    Accessor.ATTR,
+    Accessor.INDEX,
+)
+NOT_PLAIN_CHARS = re.compile(r"""[\\"'?]""")
+
+FILTER_EXPR = re.compile(
+    rf"""\s*(?P<operand>@|(?:{QUOTED_STRING}|[^\s=!<>"'])+)"""
+    r"""\s*(?:(?P<op>==|!=|<=|>=|<|>)\s*(?P<literal>.+?))?\s*""",
+    re.DOTALL,
+)
+QUOTED_OPERAND = re.compile(QUOTED_STRING, re.DOTALL)
+FILTER_OPS = {
+    "==": eq,
+    "!=": ne,
+    "<": lt,
+    "<=": le,
+    ">": gt,
+    ">=": ge,
+}
+
+# Maximum number of compiled paths kept by the module-level path cache
+PATH_CACHE_SIZE = 1024
+
+# Maximum number of path tries kept for ``get_many``
+TRIE_CACHE_SIZE = 128
+
+# Number of calls after which a compiled path generates specialized code
+SPECIALIZE_THRESHOLD = 100
+
+# Number of profiled calls after which a path string is specialized
+PROMOTE_THRESHOLD = 100
+
+# Maximum number of path strings tracked by ``enable_profiling()``
+PROFILE_SIZE = 4096
+
+# Maximum number of receiver types kept in the inline cache of each getter
+INLINE_CACHE_SIZE = 8
+
+# Maximum number of types whose ``container_accessor()`` is cached
+TYPE_CACHE_SIZE = 256
+
+# Errors raised by a single action when the target doesn't exist
+LOOKUP_ERRORS = (LookupError, AttributeError, TypeError)
+
+# Factories for containers created by ``set(..., create=True)``, keyed by the
+# accessor that will be used on the new container
+DEFAULT_FACTORIES = {
+    Accessor.ATTR: SimpleNamespace,
+    Accessor.KEY: dict,
+    Accessor.INDEX: list,
+}
+
+# Sequences that are treated as leaves rather than containers
+SCALAR_SEQUENCES = (str, bytes, bytearray, memoryview)
+
+# Sequences whose slices are read as a ``memoryview``, see ``slice_view()``
+BUFFER_SEQUENCES = (bytes, bytearray, memoryview, array.array)
 
+# Sequences whose slices are read as a ``ListView``, see ``slice_view()``
+VIEW_SEQUENCES = (MutableSequence, tuple)
 
-def get(data, path):
+
+class Filter:
+    """Action item that matches the children of an object that pass a test.
+
+    Filters are written ``[?operand op literal]`` or ``[?operand]``. The
+    operand is ``@`` (the child itself), a bare key name, or a path into the
+    child. A key name with spaces or operator characters can be quoted, as
+    in ``[?"my key"==1]``. The literal is a Python literal, and the op is
+    one of ``==``, ``!=``, ``<``, ``<=``, ``>`` and ``>=``. Without an op,
+    the operand is tested for truth. A child where the operand doesn't
+    exist, or can't be compared with the literal, doesn't match.
+
+    The expression is parsed once, when the path is parsed, and evaluated
+    lazily as the children are visited.
+
+    Args:
+        source (str): The filter expression, without the ``[?`` and ``]``.
+    """
+
+    __slots__ = ("source", "_operand", "_compare", "_literal")
+
+    def __init__(self, source):
+        match = FILTER_EXPR.fullmatch(source)
+        if match is None:
+            raise InvalidFilter(source, "expected `operand [op literal]`")
+        operand, op, literal = match.group("operand", "op", "literal")
+
+        if operand == "@":
+            self._operand = None
+        else:
+            if QUOTED_OPERAND.fullmatch(operand):
+                key = ESCAPE.sub(r"\1", operand[1:-1])
+                operand = format_path((Action(key, Accessor.KEY),))
+            elif operand[0] not in LHS_OPS:
+                if "'" in operand or '"' in operand:
+                    raise InvalidFilter(source, "misplaced quote in operand")
+                operand = format_path((Action(operand, Accessor.KEY),))
+            self._operand = compile(operand)
+            if self._operand.fan_out:
+                raise InvalidFilter(source, "operand can't fan out")
+
+        self.source = source
+        self._compare = FILTER_OPS[op] if op else None
+        self._literal = None
+        if op:
+            try:
+                self._literal = ast.literal_eval(literal)
+            except (ValueError, SyntaxError):
+                raise InvalidFilter(source, f"invalid literal {literal}")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.source!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Filter):
+            return NotImplemented
+        return self.source == other.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def __reduce__(self):
+        return Filter, (self.source,)
+
+    def __call__(self, value):
+        """Return whether ``value`` passes this filter."""
+        if self._operand is not None:
+            report = self._operand.lookup(value)
+            if not report:
+                return False
+            value = report.node.value
+        if self._compare is None:
+            return bool(value)
+        try:
+            return bool(self._compare(value, self._literal))
+        except TypeError:
+            return False
+
+
+class _MISSING:
+    """Sentinel for a missing value or an omitted default."""
+
+
+def get(data, path, default=_MISSING):
     """Fetch the value of an arbitrarily nested property.
 
     Args:
@@ -81,7 +494,9 @@ def get(data, path):
             It must support attribute access (`__getattribute__`) or item
             access (`__getitem__`).
         path (str): Path to the target property in ``data``.
-        value: The value to write to the target property.
+        default: Value to return if the target property doesn't exist. If
+            given, the lookup is made without raising and catching any
+            exceptions internally. If omitted, the lookup error is raised.
 
     Returns:
         The value of the target property.
@@ -95,12 +510,16 @@ def get(data, path):
         <class '__main__.T'>
         >>> nested.get(obj, '#2[foo].y')
         -2
+        >>> nested.get(obj, '#1[bar]', default=0)
+        0
     """
 
-    return get_with_context(data, path).value
+    if _profile is not None:
+        return _profile.run(path, "get", data, default)
+    return compile(path).get(data, default)
 
 
-def set(data, path, value):
+def set(data, path, value, create=False):
     """Set the value of an arbitrarily nested property.
 
     Args:
@@ -109,17 +528,27 @@ def set(data, path, value):
             or item access (`__getitem__`).
         path (str): Path to the target property in ``data``.
         value: The value to write to the target property.
+        create (bool or dict): If true, missing (or None) intermediate
+            containers are created during the traversal instead of raising,
+            and sequences are padded with None up to a missing INDEX. The
+            type of each new container is chosen by the accessor of the
+            action that follows it, using ``DEFAULT_FACTORIES``. Pass a dict
+            mapping ``Accessor`` members to factories to override them.
 
     Returns:
         The modified ``data`` object. Since this function mutates ``data``, the
 
         return value is not meaningful and is simply a convenience to allow
         method chaining.
-    """
-    node = get_with_context(data, path)
-    put(node.parent, node.action, value)
 
-    return data
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.set({}, '[a]#2.b', 5, create=True)
+        {'a': [None, None, namespace(b=5)]}
+    """
+    if _profile is not None:
+        return _profile.run(path, "set", data, value, create)
+    return compile(path).set(data, value, create)
 
 
 def update(data, path, transform):
@@ -141,11 +570,9 @@ def update(data, path, transform):
         return value is not meaningful and is simply a convenience to allow
         method chaining.
     """
-    node = get_with_context(data, path)
-    value = transform(node)
-    put(node.parent, node.action, value)
-
-    return data
+    if _profile is not None:
+        return _profile.run(path, "update", data, transform)
+    return compile(path).update(data, transform)
 
 
 def delete(data, path):
@@ -163,155 +590,2690 @@ def delete(data, path):
         return value is not meaningful and is simply a convenience to allow
         method chaining.
     """
-    node = get_with_context(data, path)
-    rm(node.parent, node.action)
+    if _profile is not None:
+        return _profile.run(path, "delete", data)
+    return compile(path).delete(data)
 
-    return data
 
+def first(data, path, default=_MISSING):
+    """Fetch the first value matched by a path.
 
-def get_with_context(data, path):
-    actions = parse_actions(path)
+    For a path with a wildcard or filter, the matches are generated lazily
+    and traversal stops at the first one, so ``[orders][?status=="open"]``
+    only tests orders up to the first open one. Branches that don't lead
+    to a match, such as an order without the key being read, are skipped.
+    For any other path, this is the same as ``get()``.
 
-    for action in actions:
-        parent = data
-        data = pick(data, action)
+    Args:
+        data: Compound data structure to traverse.
+        path (str): Path to the target property in ``data``.
+        default: Value to return if nothing matches. If omitted, a lookup
+            error is raised instead.
 
-    return DataNode(value=data, action=action, parent=parent)
+    Returns:
+        The value of the first match.
 
+    Examples:
+        >>> from miscutils import nested
+        >>> data = {'orders': [{'id': 1, 'total': 5}, {'id': 2, 'total': 9}]}
+        >>> nested.first(data, '[orders][?total>6][id]')
+        2
+    """
+    return compile(path).first(data, default)
 
-def pick(data, action):
-    if action.accessor is Accessor.ATTR:
-        return getattr(data, action.item)
-    elif action.accessor is Accessor.KEY:
-        return data[action.item]
-    elif action.accessor is Accessor.INDEX:
-        return data[int(action.item)]
-    else:
-        raise ValueError(
-            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
-        )
 
+def get_with_context(data, path, default=_MISSING):
+    return compile(path).get_with_context(data, default)
 
-def put(data, action, value):
-    if action.accessor is Accessor.ATTR:
-        setattr(data, action.item, value)
-    elif action.accessor is Accessor.KEY:
-        data[action.item] = value
-    elif action.accessor is Accessor.INDEX:
-        data[int(action.item)] = value
-    else:
-        raise ValueError(
-            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
-        )
 
+def exists(data, path):
+    """Check whether an arbitrarily nested property exists.
 
-def rm(data, action):
-    if action.accessor is Accessor.ATTR:
-        delattr(data, action.item)
-    elif action.accessor is Accessor.KEY:
-        del data[action.item]
-    elif action.accessor is Accessor.INDEX:
-        del data[int(action.item)]
-    else:
-        raise ValueError(
-            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+    Each step is looked up without raising exceptions: mappings with
+    ``.get()``, sequences with a length check and attributes with
+    ``getattr()`` and a sentinel default.
+
+    Args:
+        data: Compound data structure to traverse.
+        path (str): Path to the target property in ``data``.
+
+    Returns:
+        Lookup: A report that is truthy if the property exists, and
+        otherwise says which action failed and where.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> bool(nested.exists({'a': [1]}, '[a]#0'))
+        True
+        >>> report = nested.exists({'a': [1]}, '[a]#3')
+        >>> report.depth, report.failed
+        (1, Action(item=3, accessor=<Accessor.INDEX: 3>))
+    """
+    return compile(path).lookup(data)
+
+
+def get_many(data, paths, default=_MISSING, defaults=None, as_dict=False):
+    """Fetch the values of several nested properties in one traversal.
+
+    The paths are merged into a trie of actions, so a prefix shared by
+    several paths (e.g. ``[payload][user]``) is only traversed once.
+
+    Args:
+        data: Compound data structure to traverse.
+        paths (iterable): Paths to the target properties in ``data``.
+        default: Value to return for any path that can't be resolved. If
+            omitted, the lookup error is raised instead.
+        defaults (dict): Per-path defaults, keyed by path. These take
+            precedence over ``default``.
+        as_dict (bool): If True, return a dict mapping each path to its
+            value instead of a tuple.
+
+    Returns:
+        A tuple of values in the same order as ``paths``, or a dict if
+        ``as_dict`` is True.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> data = {'user': {'name': 'bob', 'tags': ['a', 'b']}}
+        >>> nested.get_many(data, ['[user][name]', '[user][tags]#1'])
+        ('bob', 'b')
+        >>> nested.get_many(data, ['[user][age]'], default=None)
+        (None,)
+    """
+    paths = tuple(paths)
+    defaults = _path_defaults(paths, default, defaults)
+    values = _compile_trie(paths).resolve(data, defaults)
+
+    if as_dict:
+        return dict(zip(paths, values))
+    return tuple(values)
+
+
+def _path_defaults(paths, default, defaults):
+    """Return a list of the default for each path in ``paths``."""
+    if defaults:
+        return [defaults.get(path, default) for path in paths]
+    return [default] * len(paths)
+
+
+def pluck(records, path, default=_MISSING):
+    """Lazily fetch the value at ``path`` from each record in ``records``.
+
+    The path is compiled once up front and no intermediate list is built, so
+    ``records`` can be any iterable, including an unbounded generator.
+
+    Args:
+        records (iterable): Compound data structures to traverse.
+        path (str): Path to the target property in each record.
+        default: Value to yield for any record where ``path`` can't be
+            resolved. If omitted, the lookup error is raised instead.
+
+    Returns:
+        An iterator over the target value of each record.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> records = ({'id': i} for i in range(3))
+        >>> list(nested.pluck(records, '[id]'))
+        [0, 1, 2]
+    """
+    path = compile(path)
+    if default is _MISSING:
+        return map(path.get, records)
+    return _pluck_default(records, path, default)
+
+
+def _pluck_default(records, path, default):
+    get_value = path.get
+    for record in records:
+        try:
+            yield get_value(record)
+        except LOOKUP_ERRORS:
+            yield default
+
+
+def pluck_many(records, paths, default=_MISSING, defaults=None):
+    """Lazily fetch the values at ``paths`` from each record in ``records``.
+
+    Like ``pluck()``, but yields a tuple of values per record, so several
+    columns can be extracted in a single pass. The paths are merged into a
+    trie once, exactly as ``get_many()`` does.
+
+    Args:
+        records (iterable): Compound data structures to traverse.
+        paths (iterable): Paths to the target properties in each record.
+        default: Value to use for any path that can't be resolved. If
+            omitted, the lookup error is raised instead.
+        defaults (dict): Per-path defaults, keyed by path. These take
+            precedence over ``default``.
+
+    Returns:
+        An iterator over a tuple of target values for each record.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> records = [{'id': 1, 'x': [5]}, {'id': 2, 'x': [6]}]
+        >>> list(nested.pluck_many(records, ['[id]', '[x]#0']))
+        [(1, 5), (2, 6)]
+    """
+    paths = tuple(paths)
+    resolve = _compile_trie(paths).resolve
+    defaults = _path_defaults(paths, default, defaults)
+
+    for record in records:
+        yield tuple(resolve(record, defaults))
+
+
+async def aget(data, path, default=_MISSING):
+    """Fetch a nested value, awaiting any awaitable met along the way.
+
+    Like ``get()``, but if ``data`` or the result of any action is
+    awaitable (e.g. a coroutine returned by a lazily loaded attribute), it
+    is awaited before the next action is applied. For a path with a
+    wildcard, the branches of each fan-out are resolved concurrently with
+    ``asyncio.gather()`` and a list of ``DataNode`` objects is returned.
+
+    Args:
+        data: Compound data structure to traverse.
+        path (str): Path to the target property in ``data``.
+        default: Value to return if the target property doesn't exist. If
+            omitted, the lookup error is raised. Ignored for wildcard paths.
+
+    Returns:
+        The value of the target property, or a list of ``DataNode`` objects
+        for a path with a wildcard.
+    """
+    path = compile(path)
+    data = await _awaited(data)
+    if path.fan_out:
+        return await _afan_out(data, path.actions, 0, None, None)
+
+    for action in path.actions:
+        try:
+            data = await _awaited(pick(data, action))
+        except LOOKUP_ERRORS:
+            if default is _MISSING:
+                raise
+            return default
+
+    return data
+
+
+async def aget_many(
+    data, paths, default=_MISSING, defaults=None, as_dict=False
+):
+    """Fetch several nested values, awaiting awaitables concurrently.
+
+    Like ``get_many()``, but awaitables are awaited as in ``aget()``, and
+    the branches of the path trie below each shared prefix are resolved
+    concurrently. Fetching 30 lazily loaded leaves therefore costs about
+    one round of latency per level rather than 30.
+
+    Returns:
+        A tuple of values in the same order as ``paths``, or a dict if
+        ``as_dict`` is True.
+    """
+    paths = tuple(paths)
+    defaults = _path_defaults(paths, default, defaults)
+    values = [_MISSING] * len(paths)
+    data = await _awaited(data)
+    await _aresolve_node(_compile_trie(paths).root, data, values, defaults)
+
+    if as_dict:
+        return dict(zip(paths, values))
+    return tuple(values)
+
+
+async def _awaited(value):
+    while inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+async def _afan_out(data, actions, depth, action, parent):
+    """Resolve ``actions[depth:]`` on ``data`` and return a list of nodes."""
+    if depth == len(actions):
+        return [DataNode(data, action, parent)]
+
+    branches = [
+        _afan_out_child(child, actions, depth + 1, child_action, data)
+        for child_action, child in expand(data, actions[depth])
+    ]
+    nodes = []
+    for branch in await asyncio.gather(*branches):
+        nodes.extend(branch)
+
+    return nodes
+
+
+async def _afan_out_child(data, actions, depth, action, parent):
+    data = await _awaited(data)
+    return await _afan_out(data, actions, depth, action, parent)
+
+
+async def _aresolve_node(node, data, values, defaults):
+    for i in node.terminals:
+        values[i] = data
+    children = node.children.values()
+    if len(children) == 1:
+        await _aresolve_child(*children, data, values, defaults)
+    elif children:
+        await asyncio.gather(
+            *(
+                _aresolve_child(child, data, values, defaults)
+                for child in children
+            )
         )
 
 
-def parse_actions(path):
-    """Attempt to parse a string into actions for modifying an object."""
-    actions = []
-    accessor = None
-    item = ""
+async def _aresolve_child(node, parent, values, defaults):
+    try:
+        data = await _awaited(node.getter(parent))
+    except LOOKUP_ERRORS:
+        for i in node.indices:
+            if defaults[i] is _MISSING:
+                raise
+            values[i] = defaults[i]
+        return
+    await _aresolve_node(node, data, values, defaults)
 
-    for char in path:
-        # Grab the operator if this char is an lhs operator char
-        lhs_op = LHS_OPS.get(char)
 
-        if accessor is None:
-            # If no current accessor, assert that char is an lhs operator
-            if not lhs_op:
-                raise MissingLHSOperator(char)
+def projector(spec, default=_MISSING):
+    """Compile a reshaping spec into a ``Projector``.
+
+    A projector is a callable that builds a new structure of nested dicts
+    from a single input object. Each key of ``spec`` is the location of a
+    value in the output, where dots separate the keys of nested dicts (or,
+    equivalently, the value can be a nested spec). Each value is the path
+    to read from the input, or a ``(path, default)`` pair.
+
+    All input paths are merged into one ``PathTrie``, so shared prefixes are
+    only traversed once per call. Projectors can be passed directly to
+    ``map()`` to reshape a stream of records.
+
+    Args:
+        spec (dict): Mapping of output locations to input paths.
+        default: Value to use for any input path that can't be resolved and
+            has no default of its own. If omitted, the lookup error is
+            raised instead.
+
+    Returns:
+        Projector: The compiled projector.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> project = nested.projector({
+        ...     'user.name': '[in][name]',
+        ...     'user.age': ('[in][age]', None),
+        ...     'id': '[id]',
+        ... })
+        >>> project({'id': 1, 'in': {'name': 'bob'}})
+        {'user': {'name': 'bob', 'age': None}, 'id': 1}
+    """
+    return Projector(spec, default)
+
+
+class Projector:
+    """Callable that reshapes objects according to a spec.
+
+    See ``projector()`` for details.
 
-            # Assign the new operator
-            accessor = lhs_op
+    Attributes:
+        spec (dict): The spec the projector was compiled from.
+    """
+
+    __slots__ = ("spec", "_trie", "_defaults", "_build")
+
+    def __init__(self, spec, default=_MISSING):
+        self.spec = spec
+        tree = {}
+        paths = []
+        self._defaults = []
+
+        for keys, source in _flatten_spec(spec, ()):
+            path, path_default = (
+                source if isinstance(source, tuple) else (source, default)
+            )
+            _insert_spec_key(tree, keys, len(paths))
+            paths.append(path)
+            self._defaults.append(path_default)
+
+        self._trie = PathTrie(paths)
+        namespace = {}
+        source = f"def build(v):\n    return {_dict_source(tree, namespace)}"
+        exec(source, namespace)  # pylint: disable=exec-used
+        self._build = namespace["build"]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.spec!r})"
+
+    def __call__(self, data):
+        return self._build(self._trie.resolve(data, self._defaults))
+
+
+def _flatten_spec(spec, prefix):
+    """Yield ``(keys, source)`` for each output location in ``spec``."""
+    for key, source in spec.items():
+        keys = prefix + tuple(key.split("."))
+        if isinstance(source, Mapping):
+            yield from _flatten_spec(source, keys)
         else:
-            # If char is not an operator char, append it to current value
-            if char not in OP_CHARS:
-                item += char
+            yield keys, source
+
+
+def _insert_spec_key(tree, keys, index):
+    *parents, last = keys
+    for key in parents:
+        tree = tree.setdefault(key, {})
+        if not isinstance(tree, dict):
+            raise ValueError(f"conflicting output key: {'.'.join(keys)}")
+    if last in tree:
+        raise ValueError(f"conflicting output key: {'.'.join(keys)}")
+    tree[last] = index
+
+
+def _dict_source(tree, namespace):
+    """Return source for a dict literal of the output ``tree``."""
+    items = []
+    for key, value in tree.items():
+        const = f"_{len(namespace)}"
+        namespace[const] = key
+        if isinstance(value, dict):
+            items.append(f"{const}: {_dict_source(value, namespace)}")
+        else:
+            items.append(f"{const}: v[{value}]")
 
-                continue
+    return "{" + ", ".join(items) + "}"
 
-            # Otherwise, translate current op into action
-            actions.append(Action(item, accessor))
-            item = ""
 
-            # If the current op expects a rhs op char...
-            rhs_op_char = RHS_OPS.get(accessor)
+def apply(data, ops, create=False):
+    """Apply a batch of writes to ``data`` as a single transaction.
 
-            if rhs_op_char:
-                # ...raise error if the current char is an lhs op char
-                if lhs_op:
-                    raise MissingRHSOperator(accessor, char)
+    Each operation is a tuple of an operation name and its arguments:
 
-                # ...clear current op if current char is the rhs op char
-                if char == rhs_op_char:
-                    accessor = None
+    * ``("set", path, value)``
+    * ``("update", path, transform)``
+    * ``("delete", path)``
 
-                continue
+    Operations are applied in order. Containers resolved for one operation
+    are remembered (until a later write replaces them), so a prefix shared
+    by several operations is only traversed once.
+
+    If any operation raises, every write already made is undone, in reverse
+    order, from an undo log of the values that were replaced, and then the
+    error is re-raised. Keys that are deleted and then restored by a
+    rollback are re-added at the end of their mapping. Since a write to a
+    slice can change the size of a sequence, slices can't be the target
+    of an operation.
+
+    Args:
+        data: Compound data structure to modify.
+        ops (iterable): The operations to apply.
+        create (bool): If True, a ``"set"`` operation may add a key or
+            attribute that doesn't exist yet, or append to a sequence. Its
+            parent must still exist.
 
-            # Else if the current op has no rhs op char...
-            if lhs_op:
-                # ...if current char is an lhs op char, start new accessor
-                accessor = lhs_op
+    Returns:
+        The modified ``data`` object.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> data = {'a': {'b': 1, 'c': [1, 2]}}
+        >>> nested.apply(data, [
+        ...     ('set', '[a][b]', 5),
+        ...     ('update', '[a][c]#0', lambda node: node.value * 10),
+        ...     ('delete', '[a][c]#1'),
+        ... ])
+        {'a': {'b': 5, 'c': [10]}}
+    """
+    containers = {(): data}
+    undo_log = []
+
+    try:
+        for name, path, *args in ops:
+            write = _WRITE_OPS.get(name)
+            if write is None:
+                raise ValueError(f"unknown operation: {name!r}")
+            path = compile(path)
+            if not path.actions:
+                _empty_path()
+            if isinstance(path.actions[-1].item, Slice):
+                raise ValueError(f"cannot apply to a slice: {path.path!r}")
+
+            if path.fan_out:
+                nodes = list(_iter_nodes(data, path._expanders))
+                prefix = _static_prefix(path.actions)
             else:
-                # ...otherwise it's a misplaced rhs op char, so raise error
-                raise UnexpectedRHSOperator(char)
+                prefix = path.actions[:-1]
+                parent = _resolve_cached(data, prefix, containers)
+                action = path.actions[-1]
+                if create and write is _write_set:
+                    value = path._safe_getters()[-1](parent)
+                else:
+                    value = pick(parent, action)
+                nodes = [DataNode(value, action, parent)]
+
+            if write is _write_delete:
+                # Delete in reverse so remaining sequence indexes stay valid
+                nodes.reverse()
+            for node in nodes:
+                write(node, undo_log, *args)
+            _invalidate(containers, prefix)
+    except BaseException:
+        for restore, parent, action, value in reversed(undo_log):
+            restore(parent, action, value)
+        raise
+
+    return data
+
 
-    # Process final accessor if it had no rhs op char
-    if accessor is not None:
-        # Raise an error if no value was present
-        if not item:
-            raise MissingValueChar(accessor)
+def _resolve_cached(data, prefix, containers):
+    """Resolve ``prefix`` from the longest prefix already in ``containers``.
 
-        # Raise an error if op expects a rhs op char
-        if accessor in RHS_OPS:
-            for char, op in LHS_OPS.items():
-                if op is accessor:
-                    raise MissingRHSOperator(accessor, char)
+    Every intermediate container resolved along the way is added to
+    ``containers``.
+    """
+    start = len(prefix)
+    while prefix[:start] not in containers:
+        start -= 1
+    data = containers[prefix[:start]]
+
+    for end in range(start + 1, len(prefix) + 1):
+        data = pick(data, prefix[end - 1])
+        containers[prefix[:end]] = data
+
+    return data
 
-        # Translate final accessor into action
-        actions.append(Action(item, accessor))
 
+def _static_prefix(actions):
+    """Return the actions before the first fan-out in ``actions``."""
+    for i, action in enumerate(actions):
+        if is_fan_out(action):
+            return actions[:i]
     return actions
 
 
-class Error(Exception):
-    """Base class for errors in this module."""
+def _invalidate(containers, prefix):
+    """Forget every cached container below ``prefix``.
+
+    Containers below the written target itself are stale, and so are those
+    below its siblings when an INDEX write shifts a sequence.
+    """
+    size = len(prefix)
+    for key in [key for key in containers if len(key) > size]:
+        if key[:size] == prefix:
+            del containers[key]
+
+
+def _write_set(node, undo_log, value):
+    if node.value is _MISSING:
+        if (
+            node.action.accessor is Accessor.INDEX
+            and isinstance(node.action.item, int)
+            and isinstance(node.parent, MutableSequence)
+        ):
+            # Undo any padding as well as the new item itself
+            size = len(node.parent)
+            undo_log.append((_truncate, node.parent, node.action, size))
+        else:
+            undo_log.append((_remove, node.parent, node.action, None))
+        put_padded(node.parent, node.action, value)
+    else:
+        undo_log.append((put, node.parent, node.action, node.value))
+        put(node.parent, node.action, value)
 
 
-class MissingRHSOperator(Error):
-    def __init__(self, op, char):
-        super().__init__(
-            f"missing rhs operator: accessor started with char '{char}':"
-            f" expected rhs op char '{RHS_OPS[op]}'"
-        )
+def _write_update(node, undo_log, transform):
+    value = transform(node)
+    undo_log.append((put, node.parent, node.action, node.value))
+    put(node.parent, node.action, value)
 
 
-class MissingLHSOperator(Error):
+def _write_delete(node, undo_log):
+    if node.action.accessor is Accessor.INDEX and isinstance(
+        node.action.item, int
+    ):
+        # Log a non-negative index, since ``insert()`` counts negative ones
+        # from the end of the shortened sequence
+        index = node.action.item % len(node.parent)
+        action = Action(index, Accessor.INDEX)
+        undo_log.append((_reinsert, node.parent, action, node.value))
+    else:
+        undo_log.append((put, node.parent, node.action, node.value))
+    rm(node.parent, node.action)
 
-    lhs_ops_repr = " , ".join(f"'{char}'" for char in LHS_OPS.keys())
 
-    def __init__(self, char):
-        super().__init__(
-            f"missing lhs operator: expected an lhs operator char"
-            f" but found '{char}' (must be one of: {self.lhs_ops_repr})"
-        )
+def _reinsert(data, action, value):
+    data.insert(action.item, value)
 
 
-class UnexpectedRHSOperator(Error):
-    def __init__(self, char):
-        super().__init__(f"unexpected rhs operator `{char}`")
+def _remove(data, action, _):
+    rm(data, action)
+
+
+def _truncate(data, action, size):
+    del data[size:]
+
+
+_WRITE_OPS = {
+    "set": _write_set,
+    "update": _write_update,
+    "delete": _write_delete,
+}
+
+
+def diff(old, new):
+    """Return the operations that turn ``old`` into ``new``.
+
+    Mappings, lists and mutable records (see ``children()``) of the same
+    type are compared item by item, and any other pair of values that
+    differs, or whose types differ (such as ``1`` and ``True``), is
+    replaced whole. Subtrees that are the same object in both
+    (``is``) are skipped without being visited, so diffing two snapshots
+    that share most of their structure costs time proportional to the
+    changed regions rather than the size of the documents.
+
+    The operations are ``("set", path, value)`` and ``("delete", path)``
+    tuples in the format taken by ``apply()``, with ``path`` formatted by
+    ``format_path()``. Apply them to (a copy of) ``old`` with ``patch()``.
+    If ``old`` and ``new`` can't be compared item by item, the result is a
+    single ``("set", "", new)`` operation that replaces the whole document.
+
+    Mapping keys must be strings, since they're formatted into paths. The
+    operations are collected into a list before they're returned, so a
+    non-string key raises before any operation is seen.
+
+    Args:
+        old: The original data.
+        new: The changed data.
+
+    Returns:
+        list: The operations, in the order they must be applied.
+
+    Raises:
+        TypeError: If a mapping that differs has a non-string key.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.diff({'a': 1, 'b': [1, 2]}, {'a': 2, 'b': [1]})
+        [('set', '[a]', 2), ('delete', '[b]#1')]
+    """
+    return list(_diff_ops(old, new))
+
+
+def _diff_ops(old, new):
+    stack = [((), old, new)]
+
+    while stack:
+        prefix, old, new = stack.pop()
+        if old is new:
+            continue
+        accessor = _diffable_accessor(old, new)
+
+        if accessor is None:
+            if not _equal_leaves(old, new):
+                yield ("set", format_path(prefix), new)
+            continue
+
+        if accessor is Accessor.INDEX:
+            common = min(len(old), len(new))
+            for i in range(len(old) - 1, common - 1, -1):
+                yield ("delete", format_path(prefix + (Action(i, accessor),)))
+            for i in range(common, len(new)):
+                path = format_path(prefix + (Action(i, accessor),))
+                yield ("set", path, new[i])
+            changed = [
+                (Action(i, accessor), old[i], new[i])
+                for i in range(common)
+                if old[i] is not new[i]
+            ]
+        else:
+            old_items = dict(children(old))
+            new_items = dict(children(new))
+            for action in old_items:
+                if action not in new_items:
+                    yield ("delete", format_path(prefix + (action,)))
+            for action, value in new_items.items():
+                if action not in old_items:
+                    yield ("set", format_path(prefix + (action,)), value)
+            changed = [
+                (action, old_items[action], value)
+                for action, value in new_items.items()
+                if action in old_items and old_items[action] is not value
+            ]
+
+        for action, old_value, new_value in reversed(changed):
+            stack.append((prefix + (action,), old_value, new_value))
+
+
+def patch(data, ops):
+    """Apply operations from ``diff()`` to ``data``.
+
+    This is ``apply()`` with ``create=True``, so the operations are applied
+    as a single transaction. A ``"set"`` of the empty path replaces ``data``
+    as a whole: the rest of the operations are applied to the new value,
+    and it's returned instead of ``data``.
+
+    Returns:
+        The modified ``data`` object, or its replacement.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.patch({'a': 1}, nested.diff({'a': 1}, [1]))
+        [1]
+    """
+    ops = list(ops)
+    for i in reversed(range(len(ops))):
+        name, path, *args = ops[i]
+        if name == "set" and not compile(path).actions:
+            data, ops = args[0], ops[i + 1 :]
+            break
+
+    return apply(data, ops, create=True)
+
+
+def _diffable_accessor(old, new):
+    """Return the accessor to diff ``old`` and ``new`` by, or None.
+
+    Only mutable containers of the same type can be diffed item by item,
+    since the resulting operations modify them in place.
+    """
+    if type(old) is not type(new):
+        return None
+    accessor = container_accessor(old)
+    if accessor is Accessor.KEY and not isinstance(old, MutableMapping):
+        return None
+    if accessor is Accessor.INDEX and not isinstance(old, MutableSequence):
+        return None
+    if accessor is Accessor.ATTR and _is_frozen_dataclass(old):
+        return None
+    return accessor
+
+
+def _equal_leaves(old, new):
+    # ``1 == True == 1.0``, but patching one into another must change type
+    if type(old) is not type(new):
+        return False
+    try:
+        return old == new
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def walk(data, order="depth", prune=None, max_depth=None):
+    """Yield a ``DataNode`` for ``data`` and every node below it.
+
+    Containers are the ones described by ``children()``. ``data`` itself is
+    yielded first, as ``DataNode(data, None, None)``. Depth-first, each
+    node is yielded before its children, in document order. Breadth-first,
+    every node at one depth is yielded before any node below it.
+
+    The traversal keeps a stack of child iterators (or, breadth-first, a
+    queue of nodes) rather than recursing, so arbitrarily deep documents
+    can't hit the recursion limit. Depth-first, its memory use grows with
+    the depth of ``data`` only.
+
+    Args:
+        data: Compound data structure to walk.
+        order (str): ``"depth"`` or ``"breadth"``.
+        prune (callable): Called with each node after it's yielded. If it
+            returns true, the node's children are skipped.
+        max_depth (int): If given, nodes more than ``max_depth`` levels
+            below ``data`` are skipped, so 0 yields ``data`` only.
+
+    Returns:
+        An iterator over ``DataNode`` objects.
+
+    Raises:
+        ValueError: If ``order`` isn't ``"depth"`` or ``"breadth"``.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> data = {'a': [1, {'b': 2}], 'c': {'d': 3}}
+        >>> [n.value for n in nested.walk(data, max_depth=2)][1:]
+        [[1, {'b': 2}], 1, {'b': 2}, {'d': 3}, 3]
+        >>> skip_lists = lambda node: isinstance(node.value, list)
+        >>> nodes = nested.walk(data, prune=skip_lists)
+        >>> [n.action.item for n in nodes if n.action]
+        ['a', 'c', 'd']
+    """
+    if order == "depth":
+        return _walk_depth_first(data, prune, max_depth)
+    if order == "breadth":
+        return _walk_breadth_first(data, prune, max_depth)
+    raise ValueError(f"order must be 'depth' or 'breadth', not {order!r}")
+
+
+def _walk_depth_first(data, prune, max_depth):
+    node = DataNode(value=data, action=None, parent=None)
+    yield node
+    if max_depth == 0 or (prune is not None and prune(node)):
+        return
+    stack = [(data, children(data))]
+
+    while stack:
+        parent, items = stack[-1]
+        for action, value in items:
+            node = DataNode(value=value, action=action, parent=parent)
+            yield node
+            if len(stack) == max_depth:
+                continue
+            if prune is not None and prune(node):
+                continue
+            stack.append((value, children(value)))
+            break
+        else:
+            stack.pop()
+
+
+def _walk_breadth_first(data, prune, max_depth):
+    queue = deque([(DataNode(value=data, action=None, parent=None), 0)])
+
+    while queue:
+        node, depth = queue.popleft()
+        yield node
+        if depth == max_depth or (prune is not None and prune(node)):
+            continue
+        parent = node.value
+        queue.extend(
+            (DataNode(value=value, action=action, parent=parent), depth + 1)
+            for action, value in children(parent)
+        )
+
+
+def flatten(data):
+    """Yield a ``(path, value)`` pair for each leaf in ``data``.
+
+    Containers are the ones described by ``children()``. Empty containers
+    are yielded as leaves, so no structure is lost, and if ``data`` itself
+    is a leaf or an empty container it's yielded with an empty path. Paths
+    are formatted by ``format_path()``, so mapping keys must be strings.
+
+    The traversal keeps a stack of child iterators rather than recursing,
+    so its memory use grows with the depth of ``data`` only, and arbitrarily
+    deep documents can't hit the recursion limit. Leaves are yielded in
+    document order.
+
+    Args:
+        data: Compound data structure to flatten.
+
+    Returns:
+        An iterator over ``(path, value)`` pairs.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> dict(nested.flatten({'a': {'b': [1, 2]}, 'c': {}}))
+        {'[a][b]#0': 1, '[a][b]#1': 2, '[c]': {}}
+    """
+    items = _peek_children(data)
+    if items is None:
+        yield "", data
+        return
+    stack = [("", items)]
+
+    while stack:
+        prefix, items = stack[-1]
+        for action, value in items:
+            path = prefix + format_path((action,))
+            grandchildren = _peek_children(value)
+            if grandchildren is None:
+                yield path, value
+            else:
+                stack.append((path, grandchildren))
+                break
+        else:
+            stack.pop()
+
+
+def _peek_children(data):
+    """Return an iterator over the children of ``data``, or None if none."""
+    items = children(data)
+    first = next(items, _MISSING)
+    if first is _MISSING:
+        return None
+    return itertools.chain((first,), items)
+
+
+def unflatten(pairs, create=True):
+    """Build a nested structure from ``(path, value)`` pairs.
+
+    This is the inverse of ``flatten()``. Each value is set in a single
+    pass with ``set(..., create=create)``, creating containers as their
+    paths are first seen, so pairs must list sequence items in index order
+    (as ``flatten()`` does). Records and tuples come back as the types
+    created by ``create``: ``SimpleNamespace`` and ``list`` by default.
+
+    Args:
+        pairs (iterable): ``(path, value)`` pairs, or a mapping of paths to
+            values.
+        create: True, or a dict mapping an ``Accessor`` to a factory for the
+            containers it creates. See ``set()``.
+
+    Returns:
+        The rebuilt structure, or None if ``pairs`` is empty.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.unflatten({'[a][b]#0': 1, '[a][b]#1': 2, '[c]': {}})
+        {'a': {'b': [1, 2]}, 'c': {}}
+    """
+    if isinstance(pairs, Mapping):
+        pairs = pairs.items()
+    factories = DEFAULT_FACTORIES
+    if isinstance(create, Mapping):
+        factories = {**factories, **create}
+    data = None
+
+    for path, value in pairs:
+        path = compile(path)
+        if not path.actions:
+            data = value
+            continue
+        if data is None:
+            data = factories[path.actions[0].accessor]()
+        path.set(data, value, create=create)
+
+    return data
+
+
+def assoc(data, path, value):
+    """Return a copy of ``data`` with the value at ``path`` set to ``value``.
+
+    Unlike ``set()``, ``data`` is left unchanged. Only the containers along
+    ``path`` (its spine) are copied; every other subtree is shared between
+    ``data`` and the result. Containers are copied with ``copy.copy()``,
+    except tuples, which are rebuilt, and frozen dataclasses, which are
+    copied with ``dataclasses.replace()``. As with ``dict`` assignment, the
+    final key or attribute needn't exist yet.
+
+    Args:
+        data: Compound data structure to copy.
+        path (str): Path to the target property in ``data``.
+        value: The value to write to the target property.
+
+    Returns:
+        The updated copy of ``data``.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> data = {'a': {'b': 1}, 'c': [1, 2]}
+        >>> new = nested.assoc(data, '[a][b]', 2)
+        >>> new, data
+        ({'a': {'b': 2}, 'c': [1, 2]}, {'a': {'b': 1}, 'c': [1, 2]})
+        >>> new['c'] is data['c']
+        True
+    """
+    spine, actions = _resolve_spine(data, path)
+
+    return _rebuild_spine(spine, actions, value)
+
+
+def dissoc(data, path):
+    """Return a copy of ``data`` with the value at ``path`` deleted.
+
+    Like ``assoc()``, only the containers along ``path`` are copied.
+
+    Args:
+        data: Compound data structure to copy.
+        path (str): Path to the target property in ``data``.
+
+    Returns:
+        The updated copy of ``data``.
+    """
+    spine, actions = _resolve_spine(data, path)
+    pick(spine[-1], actions[-1])
+    parent = _copy_without(spine[-1], actions[-1])
+
+    return _rebuild_spine(spine[:-1], actions[:-1], parent)
+
+
+def update_in(data, path, transform):
+    """Return a copy of ``data`` with the value at ``path`` transformed.
+
+    Like ``assoc()``, only the containers along ``path`` are copied.
+
+    Args:
+        data: Compound data structure to copy.
+        path (str): Path to the target value in ``data``.
+        transform (callable): Callable that transforms the target value.
+            It should take a ``DataNode`` instance as its sole argument.
+
+    Returns:
+        The updated copy of ``data``.
+    """
+    spine, actions = _resolve_spine(data, path)
+    value = pick(spine[-1], actions[-1])
+    node = DataNode(value=value, action=actions[-1], parent=spine[-1])
+    value = transform(node)
+
+    return _rebuild_spine(spine, actions, value)
+
+
+def _resolve_spine(data, path):
+    """Return the containers along ``path`` and the path's actions.
+
+    The returned spine starts with ``data`` and ends with the target's
+    parent, so it is exactly as long as the actions.
+    """
+    path = compile(path)
+    if path.fan_out:
+        raise ValueError(f"wildcards aren't supported here: {path.path!r}")
+    if not path.actions:
+        raise ValueError("cannot modify the root of a path with no actions")
+    spine = [data]
+    for action in path.actions[:-1]:
+        spine.append(pick(spine[-1], action))
+
+    return spine, path.actions
+
+
+def _rebuild_spine(spine, actions, value):
+    """Copy each container in ``spine``, bottom up, to hold the new child."""
+    for parent, action in zip(reversed(spine), reversed(actions)):
+        value = _copy_with(parent, action, value)
+
+    return value
+
+
+def _copy_with(data, action, value):
+    """Return a shallow copy of ``data`` with ``action`` set to ``value``."""
+    if isinstance(data, tuple):
+        items = list(data)
+        items[action.item] = value
+        return _rebuild_tuple(data, items)
+    if action.accessor is Accessor.ATTR and _is_frozen_dataclass(data):
+        return dataclasses.replace(data, **{action.item: value})
+    data = copy.copy(data)
+    put(data, action, value)
+
+    return data
+
+
+def _copy_without(data, action):
+    """Return a shallow copy of ``data`` with ``action`` deleted."""
+    if isinstance(data, tuple):
+        items = list(data)
+        del items[action.item]
+        return _rebuild_tuple(data, items)
+    data = copy.copy(data)
+    rm(data, action)
+
+    return data
+
+
+def _rebuild_tuple(data, items):
+    if hasattr(data, "_make"):
+        return data._make(items)
+    return type(data)(items)
+
+
+def _is_frozen_dataclass(data):
+    return dataclasses.is_dataclass(data) and data.__dataclass_params__.frozen
+
+
+def compile(path):
+    """Compile a path into a reusable ``CompiledPath``.
+
+    Compiled paths are cached, so compiling the same path string twice
+    returns the same object without parsing it again.
+
+    Args:
+        path (str): Path to compile. If it is already a ``CompiledPath``, it
+            is returned as-is.
+
+    Returns:
+        CompiledPath: The compiled path.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> path = nested.compile('[foo]#1')
+        >>> path.get({'foo': [4, 5]})
+        5
+        >>> path is nested.compile('[foo]#1')
+        True
+    """
+    if isinstance(path, CompiledPath):
+        return path
+    return _compile_cached(path)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def _compile_cached(path):
+    return CompiledPath(path)
+
+
+def cache_info():
+    """Return hit/miss statistics for the module-level path cache.
+
+    Returns:
+        A ``functools._CacheInfo`` named tuple with the fields ``hits``,
+        ``misses``, ``maxsize`` and ``currsize``.
+    """
+    return _compile_cached.cache_info()
+
+
+def cache_clear():
+    """Empty the module-level path cache and reset its statistics."""
+    _compile_cached.cache_clear()
+
+
+def enable_profiling(threshold=PROMOTE_THRESHOLD):
+    """Start profiling the path strings given to the module-level functions.
+
+    While profiling is on, every call to ``get``, ``set``, ``update`` or
+    ``delete`` with a path string is counted and timed. A path string that
+    hasn't been seen before is parsed but not specialized (see
+    ``CompiledPath``), which is much cheaper for paths that are only used a
+    few times. After ``threshold`` calls, it is promoted to the specialized
+    ``CompiledPath`` from the module-level path cache.
+
+    Up to ``PROFILE_SIZE`` path strings are tracked. Calls with any other
+    path, or with a ``CompiledPath``, run as usual and aren't recorded.
+
+    Enabling profiling again discards everything recorded so far.
+
+    Args:
+        threshold (int): Number of calls after which a path is promoted.
+    """
+    global _profile
+    _profile = _Profile(threshold)
+
+
+def disable_profiling():
+    """Stop profiling and discard everything recorded so far."""
+    global _profile
+    _profile = None
+
+
+def stats():
+    """Report the path strings recorded since ``enable_profiling()``.
+
+    The time of a call that returns a lazy generator, such as ``get`` with
+    a wildcard, covers creating the generator, not consuming it.
+
+    Returns:
+        list: A ``PathStats`` for each path string, with the largest
+        cumulative time first. The list is empty if profiling is off.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.enable_profiling(threshold=2)
+        >>> for _ in range(3):
+        ...     _ = nested.get({'a': [1]}, '[a]#0')
+        >>> [(s.path, s.calls, s.state) for s in nested.stats()]
+        [('[a]#0', 3, 'specialized')]
+    """
+    profile = _profile
+    if profile is None:
+        return []
+    return sorted(
+        (
+            PathStats(path, entry.calls, entry.state, entry.time)
+            for path, entry in profile.entries.items()
+        ),
+        key=attrgetter("time"),
+        reverse=True,
+    )
+
+
+class _Profile:
+    """Calls, time and compiled path of each profiled path string."""
+
+    __slots__ = ("threshold", "entries")
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.entries = {}
+
+    def run(self, path, method, *args):
+        """Call ``method`` of the compiled ``path`` with ``args``."""
+        entry = self.entries.get(path)
+        if entry is None:
+            if (
+                isinstance(path, CompiledPath)
+                or len(self.entries) >= PROFILE_SIZE
+            ):
+                return getattr(compile(path), method)(*args)
+            entry = _ProfileEntry(path, self.threshold)
+            self.entries[path] = entry
+
+        start = perf_counter()
+        try:
+            return getattr(entry.path, method)(*args)
+        finally:
+            entry.time += perf_counter() - start
+            entry.calls += 1
+            if entry.calls == self.threshold:
+                entry.promote(path)
+
+
+class _ProfileEntry:
+    __slots__ = ("path", "state", "calls", "time")
+
+    def __init__(self, path, threshold):
+        self.calls = 0
+        self.time = 0.0
+        if threshold > 0:
+            self.path = CompiledPath(path, threshold=None)
+            self.state = "interpreted"
+        else:
+            self.promote(path)
+
+    def promote(self, path):
+        """Replace the interpreted path with the specialized one."""
+        self.path = compile(path)
+        if not self.path.fan_out:
+            self.path._promote()
+        self.state = "specialized"
+
+
+_profile = None
+
+
+class CompiledPath:
+    """A path that has been parsed once and can be executed many times.
+
+    ``CompiledPath`` objects expose the same operations as the module-level
+    functions, minus the ``path`` argument. Create them with ``compile()``.
+
+    A new path is interpreted: each call walks the actions with ``pick()``,
+    which costs nothing to set up. Once the path has been used
+    ``threshold`` times, the action chain is specialized into plain Python
+    functions (see ``_specialize()``), so executing a hot path costs about
+    the same as writing the equivalent ``obj["a"].b[3]`` by hand.
+    Generating that code takes about as long as a hundred interpreted
+    calls, so paths that are only used a few times, such as paths built
+    from varying indexes, never pay for it. Paths that fan out can't be
+    specialized, but each of their concrete steps is still bound to its
+    ``getter()`` once, on construction.
+
+    Paths that contain a wildcard fan out to many targets. For these, ``get``
+    and ``get_with_context`` return a lazy generator of ``DataNode`` objects
+    and ``set``, ``update`` and ``delete`` apply to every target.
+
+    Args:
+        path (str): Path to parse.
+        threshold (int): Number of calls after which the path is
+            specialized. If 0, it is specialized on construction, and if
+            None, it is never specialized.
+
+    Attributes:
+        path (str): The original path string.
+        actions (tuple): The parsed ``Action`` sequence.
+        fan_out (bool): Whether the path contains a wildcard.
+        specialized (bool): Whether the path runs specialized code.
+    """
+
+    __slots__ = (
+        "path",
+        "actions",
+        "fan_out",
+        "specialized",
+        "_threshold",
+        "_calls",
+        "_safe_picks",
+        "_expanders",
+        "_get",
+        "_resolve",
+        "_put",
+        "_set",
+        "_delete",
+    )
+
+    def __init__(self, path, threshold=SPECIALIZE_THRESHOLD):
+        self.path = path
+        self.actions = tuple(parse_actions(path))
+        self.fan_out = any(map(is_fan_out, self.actions))
+        self.specialized = False
+        self._threshold = threshold
+        self._calls = 0
+        if self.fan_out:
+            self._expanders = tuple(map(_expander, self.actions))
+            return
+        self._safe_picks = None
+        if threshold == 0 or not self.actions:
+            self._promote()
+        else:
+            self._get = self._interpreted_get
+            self._resolve = self._interpreted_resolve
+            self._put = self._interpreted_put
+            self._set = self._interpreted_set
+            self._delete = self._interpreted_delete
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r})"
+
+    def _count_call(self):
+        """Count an interpreted call and specialize at the threshold."""
+        self._calls += 1
+        if self._calls == self._threshold:
+            self._promote()
+
+    # Interpreted versions of the functions returned by ``_specialize()``,
+    # used until the path is promoted.
+
+    def _interpreted_get(self, obj):
+        self._count_call()
+        for action in self.actions:
+            obj = pick(obj, action)
+        return obj
+
+    def _interpreted_resolve(self, obj):
+        self._count_call()
+        obj = _walk_spine(obj, self.actions)
+        return obj, pick(obj, self.actions[-1])
+
+    def _interpreted_put(self, parent, value):
+        put(parent, self.actions[-1], value)
+
+    def _interpreted_set(self, obj, value):
+        self._count_call()
+        obj = _walk_spine(obj, self.actions)
+        pick(obj, self.actions[-1])
+        put(obj, self.actions[-1], value)
+
+    def _interpreted_delete(self, obj):
+        self._count_call()
+        rm(_walk_spine(obj, self.actions), self.actions[-1])
+
+    def _safe_getters(self):
+        """Return the ``safe_getter()`` of each action, built on first use."""
+        safe_picks = self._safe_picks
+        if safe_picks is None:
+            safe_picks = tuple(map(safe_getter, self.actions))
+            self._safe_picks = safe_picks
+        return safe_picks
+
+    def _install(self, functions):
+        (
+            self._get,
+            self._resolve,
+            self._put,
+            self._set,
+            self._delete,
+        ) = functions
+
+    def _promote(self):
+        """Replace the interpreted functions with specialized ones."""
+        if not self.specialized:
+            self._install(_specialize(self.actions))
+            self.specialized = True
+
+    def __eq__(self, other):
+        if not isinstance(other, CompiledPath):
+            return NotImplemented
+        return self.actions == other.actions
+
+    def __hash__(self):
+        return hash(self.actions)
+
+    def __reduce__(self):
+        # The specialized functions can't be pickled, so send only the path
+        # and compile it again (through the cache) on the other side.
+        return compile, (self.path,)
+
+    def get(self, data, default=_MISSING):
+        """Fetch the value at this path in ``data``. See ``get()``."""
+        if self.fan_out:
+            return _iter_nodes(data, self._expanders)
+        if default is _MISSING:
+            return self._get(data)
+        report = self.lookup(data)
+
+        return report.node.value if report else default
+
+    def first(self, data, default=_MISSING):
+        """Fetch the first match of this path in ``data``. See ``first()``."""
+        if not self.fan_out:
+            return self.get(data, default)
+        node = _first_node(data, self._expanders)
+        if node is not _MISSING:
+            return node.value
+        if default is _MISSING:
+            raise KeyError(f"no match for path: {self.path}")
+        return default
+
+    def get_with_context(self, data, default=_MISSING):
+        """Fetch the ``DataNode`` at this path in ``data``.
+
+        If ``default`` is given and the target doesn't exist, a node with
+        the default as its value is returned. Its parent is the target's
+        parent if that exists, or None otherwise.
+        """
+        if self.fan_out:
+            return _iter_nodes(data, self._expanders)
+        if not self.actions:
+            return DataNode(value=data, action=None, parent=None)
+        action = self.actions[-1]
+        if default is _MISSING:
+            parent, value = self._resolve(data)
+            return DataNode(value=value, action=action, parent=parent)
+
+        report = self.lookup(data)
+        if report:
+            return report.node
+        parent = None
+        if report.depth == len(self.actions) - 1:
+            parent = report.node.value
+
+        return DataNode(value=default, action=action, parent=parent)
+
+    def lookup(self, data):
+        """Look up the target in ``data`` without raising. See ``exists()``."""
+        if self.fan_out:
+            raise ValueError(f"wildcards aren't supported: {self.path!r}")
+        node = DataNode(value=data, action=None, parent=None)
+        safe_picks = self._safe_getters()
+
+        for depth, action in enumerate(self.actions):
+            value = safe_picks[depth](node.value)
+            if value is _MISSING:
+                return Lookup(node=node, depth=depth, failed=action)
+            node = DataNode(value=value, action=action, parent=node.value)
+
+        return Lookup(node=node, depth=len(self.actions), failed=None)
+
+    def set(self, data, value, create=False):
+        """Set the value at this path in ``data``. See ``set()``."""
+        if self.fan_out:
+            if create:
+                raise ValueError(f"wildcards can't create: {self.path!r}")
+            for node in _iter_nodes(data, self._expanders):
+                put(node.parent, node.action, value)
+            return data
+        if create:
+            self._set_creating(data, value, create)
+            return data
+        self._set(data, value)
+
+        return data
+
+    def _set_creating(self, data, value, create):
+        """Set the value at this path, creating missing containers."""
+        factories = DEFAULT_FACTORIES
+        if isinstance(create, Mapping):
+            factories = {**factories, **create}
+        if not self.actions:
+            _empty_path()
+        safe_picks = self._safe_getters()
+
+        for depth, action in enumerate(self.actions[:-1]):
+            child = safe_picks[depth](data)
+            if child is _MISSING or child is None:
+                factory = factories[self.actions[depth + 1].accessor]
+                put_padded(data, action, factory())
+                # Read the new container back, since proxies such as
+                # ``track()`` and ``LazyDocument`` store it wrapped or copied.
+                child = safe_picks[depth](data)
+            data = child
+
+        put_padded(data, self.actions[-1], value)
+
+    def update(self, data, transform):
+        """Transform the value at this path in ``data``. See ``update()``."""
+        if self.fan_out:
+            for node in _iter_nodes(data, self._expanders):
+                node = _copy_buffer_slice(node)
+                put(node.parent, node.action, transform(node))
+            return data
+        node = _copy_buffer_slice(self.get_with_context(data))
+        self._put(node.parent, transform(node))
+
+        return data
+
+    def delete(self, data):
+        """Delete the value at this path in ``data``. See ``delete()``."""
+        if self.fan_out:
+            # Collect targets first, since deleting them while traversing
+            # would change the size of the containers being iterated. Deleting
+            # in reverse keeps the remaining sequence indexes valid.
+            for node in reversed(list(_iter_nodes(data, self._expanders))):
+                rm(node.parent, node.action)
+            return data
+        self._delete(data)
+
+        return data
+
+
+def _copy_buffer_slice(node):
+    """Replace the ``memoryview`` of a buffer slice in ``node`` with a copy.
+
+    While the view is alive the buffer can't be resized, so ``update()``
+    passes the transform a copy, and the transformed slice can have a
+    different length.
+    """
+    if type(node.value) is not memoryview or not isinstance(
+        node.action.item, Slice
+    ):
+        return node
+    node.value.release()
+
+    return node._replace(value=node.parent[slice(*node.action.item)])
+
+
+def _specialize(actions):
+    """Generate functions that execute ``actions`` without per-step dispatch.
+
+    The actions are folded into a single Python expression, e.g. the actions
+    for ``'[a].b#3'`` become ``obj[_0].b[3]``. KEY items are bound as
+    constants in the generated functions' globals and INDEX items are
+    converted to ``int`` (or bound as a ``slice`` or tuple) here, once,
+    rather than on every access.
+
+    Returns:
+        A ``(get, resolve, put, set, delete)`` tuple of functions where
+        ``get(obj)`` returns the target value, ``resolve(obj)`` returns a
+        ``(parent, value)`` pair, ``put(parent, value)`` writes the target on
+        its parent, ``set(obj, value)`` replaces the (existing) target from
+        the root and ``delete(obj)`` deletes the target.
+    """
+    if not actions:
+        return (_identity, None, _empty_path, _empty_path, _empty_path)
+
+    namespace = {"_slice_view": slice_view}
+    parent = "obj"
+    for i, action in enumerate(actions[:-1]):
+        parent = _access_expr(parent, action, f"_{i}", namespace)
+    leaf = actions[-1]
+    const = f"_{len(actions) - 1}"
+    source = "\n".join(
+        (
+            "def get(obj):",
+            f"    return {_access_expr(parent, leaf, const, namespace)}",
+            "def resolve(obj):",
+            f"    parent = {parent}",
+            f"    return parent, {_access_expr('parent', leaf, const, {})}",
+            "def put(parent, value):",
+            f"    {_assign_stmt('parent', leaf, const)}",
+            "def set(obj, value):",
+            f"    parent = {parent}",
+            f"    {_access_expr('parent', leaf, const, {})}",
+            f"    {_assign_stmt('parent', leaf, const)}",
+            "def delete(obj):",
+            f"    {_delete_stmt(parent, leaf, const)}",
+        )
+    )
+    exec(source, namespace)  # pylint: disable=exec-used
+
+    return tuple(
+        namespace[name] for name in ("get", "resolve", "put", "set", "delete")
+    )
+
+
+def _access_expr(expr, action, const, namespace, view=True):
+    """Return source that applies ``action`` to the expression ``expr``.
+
+    Slices are read with ``slice_view()``, unless ``view`` is False, as it
+    must be for a target of an assignment or ``del``.
+    """
+    if action.accessor is Accessor.ATTR:
+        if _is_plain_name(action.item):
+            return f"{expr}.{action.item}"
+        namespace[const] = action.item
+        return f"getattr({expr}, {const})"
+    elif action.accessor is Accessor.KEY:
+        namespace[const] = action.item
+        return f"{expr}[{const}]"
+    elif action.accessor is Accessor.INDEX:
+        index = subscript(action.item)
+        if type(index) is int:
+            return f"{expr}[{index!r}]"
+        namespace[const] = index
+        if type(index) is slice and view:
+            return f"_slice_view({expr}, {const})"
+        return f"{expr}[{const}]"
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def _assign_stmt(expr, action, const):
+    """Return source that assigns ``value`` to ``action`` on ``expr``."""
+    if action.accessor is Accessor.ATTR and not _is_plain_name(action.item):
+        return f"setattr({expr}, {const}, value)"
+    return f"{_access_expr(expr, action, const, {}, view=False)} = value"
+
+
+def _delete_stmt(expr, action, const):
+    """Return source that deletes ``action`` on ``expr``."""
+    if action.accessor is Accessor.ATTR and not _is_plain_name(action.item):
+        return f"delattr({expr}, {const})"
+    return f"del {_access_expr(expr, action, const, {}, view=False)}"
+
+
+def _is_plain_name(name):
+    return name.isidentifier() and not iskeyword(name)
+
+
+def _walk_spine(obj, actions):
+    for action in actions[:-1]:
+        obj = pick(obj, action)
+    return obj
+
+
+def _identity(obj):
+    return obj
+
+
+def _empty_path(*_):
+    raise ValueError("cannot modify the root of a path with no actions")
+
+
+def getter(action):
+    """Return a callable that applies a single ``action`` to its argument."""
+    if is_fan_out(action):
+        raise ValueError(f"wildcard has no single getter: {action}")
+    elif action.accessor is Accessor.ATTR:
+        if "." in action.item:
+            return partial(_getattr, name=action.item)
+        return attrgetter(action.item)
+    elif action.accessor is Accessor.KEY:
+        return itemgetter(action.item)
+    elif action.accessor is Accessor.INDEX:
+        index = subscript(action.item)
+        if type(index) is slice:
+            return partial(slice_view, index=index)
+        return itemgetter(index)
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def _getattr(obj, name):
+    return getattr(obj, name)
+
+
+def safe_getter(action):
+    """Return a callable that applies ``action`` without raising.
+
+    The callable returns ``_MISSING`` if the target doesn't exist. Mappings
+    are read with ``.get()``, sequences are bounds-checked and attributes
+    are read with ``getattr()`` and a default, so the common cases never
+    raise an exception internally. Other objects fall back to catching
+    ``LOOKUP_ERRORS``.
+
+    Exact dicts and lists are read inline. For other receivers, KEY and
+    INDEX getters keep an inline cache of the reader chosen for each type,
+    e.g. the ``get`` method of a ``Mapping`` subclass, so the ``Mapping``
+    and ``Sequence`` checks are made once per type rather than on every
+    call. The cache holds up to ``INLINE_CACHE_SIZE`` types; past that,
+    readers are chosen on every call.
+    """
+    item = action.item
+
+    if action.accessor is Accessor.ATTR:
+
+        def safe_attr(data):
+            return getattr(data, item, _MISSING)
+
+        return safe_attr
+
+    elif action.accessor is Accessor.KEY:
+        key_readers = {}
+
+        def safe_key(data):
+            if type(data) is dict:
+                return data.get(item, _MISSING)
+            read = key_readers.get(type(data))
+            if read is None:
+                read = _cache_reader(key_readers, type(data), _key_reader)
+            return read(data, item, _MISSING)
+
+        return safe_key
+
+    elif action.accessor is Accessor.INDEX and not isinstance(item, int):
+        read = getter(action)
+
+        def safe_subscript(data):
+            try:
+                return read(data)
+            except LOOKUP_ERRORS:
+                return _MISSING
+
+        return safe_subscript
+
+    elif action.accessor is Accessor.INDEX:
+        index_readers = {}
+
+        def safe_index(data):
+            if type(data) is list:
+                if -len(data) <= item < len(data):
+                    return data[item]
+                return _MISSING
+            read = index_readers.get(type(data))
+            if read is None:
+                read = _cache_reader(index_readers, type(data), _index_reader)
+            return read(data, item, _MISSING)
+
+        return safe_index
+
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def _cache_reader(readers, cls, choose):
+    read = choose(cls)
+    if len(readers) < INLINE_CACHE_SIZE:
+        readers[cls] = read
+    return read
+
+
+def _key_reader(cls):
+    """Return a ``(data, key, default)`` reader for instances of ``cls``."""
+    if issubclass(cls, Mapping):
+        return cls.get
+    return _read_item
+
+
+def _index_reader(cls):
+    """Return a ``(data, index, default)`` reader for instances of ``cls``."""
+    if issubclass(cls, Sequence):
+        return _read_index
+    return _read_item
+
+
+def _read_index(data, index, default):
+    if -len(data) <= index < len(data):
+        return data[index]
+    return default
+
+
+def _read_item(data, item, default):
+    try:
+        return data[item]
+    except LOOKUP_ERRORS:
+        return default
+
+
+@lru_cache(maxsize=TRIE_CACHE_SIZE)
+def _compile_trie(paths):
+    return PathTrie(paths)
+
+
+class PathTrie:
+    """A trie of compiled paths that shares common prefixes.
+
+    Each edge of the trie is an ``Action``. Resolving the trie against some
+    data walks every shared prefix only once, no matter how many paths
+    start with it.
+
+    Args:
+        paths (iterable): Paths to merge into the trie.
+
+    Attributes:
+        paths (tuple): The ``CompiledPath`` of each path, in order.
+        root (TrieNode): The root node of the trie.
+    """
+
+    __slots__ = ("paths", "root")
+
+    def __init__(self, paths):
+        self.paths = tuple(compile(path) for path in paths)
+        self.root = TrieNode(None)
+
+        for i, path in enumerate(self.paths):
+            node = self.root
+            node.indices.append(i)
+            for action in path.actions:
+                child = node.children.get(action)
+                if child is None:
+                    child = node.children[action] = TrieNode(getter(action))
+                node = child
+                node.indices.append(i)
+            node.terminals.append(i)
+
+    def resolve(self, data, defaults):
+        """Resolve every path in the trie against ``data``.
+
+        Args:
+            data: Compound data structure to traverse.
+            defaults (list): The default of each path, in order. A default
+                of ``_MISSING`` means the lookup error should be raised.
+
+        Returns:
+            list: The value of each path, in order.
+        """
+        values = [_MISSING] * len(self.paths)
+        self.resolve_node(self.root, data, values, defaults)
+
+        return values
+
+    @staticmethod
+    def resolve_node(node, data, values, defaults):
+        """Resolve every path through ``node`` against ``data``.
+
+        Args:
+            node (TrieNode): Node of the trie that ``data`` corresponds to.
+            data: Compound data structure to traverse.
+            values (list): List to write the value of each path into.
+            defaults (list): The default of each path. See ``resolve()``.
+        """
+        stack = [(node, data)]
+
+        while stack:
+            node, value = stack.pop()
+            for i in node.terminals:
+                values[i] = value
+            for child in node.children.values():
+                try:
+                    stack.append((child, child.getter(value)))
+                except LOOKUP_ERRORS:
+                    for i in child.indices:
+                        if defaults[i] is _MISSING:
+                            raise
+                        values[i] = defaults[i]
+
+
+class TrieNode:
+    """A node in a ``PathTrie``.
+
+    Attributes:
+        getter (callable): Callable that applies the action on the edge
+            leading to this node.
+        children (dict): Child nodes, keyed by ``Action``.
+        indices (list): Indices of every path that passes through this node.
+        terminals (list): Indices of every path that ends at this node.
+    """
+
+    __slots__ = ("getter", "children", "indices", "terminals")
+
+    def __init__(self, getter):
+        self.getter = getter
+        self.children = {}
+        self.indices = []
+        self.terminals = []
+
+
+def is_fan_out(action):
+    """Return whether ``action`` may match more than once. See ``expand()``."""
+    return action.item is WILDCARD or isinstance(action.item, Filter)
+
+
+def iter_nodes(data, actions):
+    """Lazily yield a ``DataNode`` for every match of ``actions`` in ``data``.
+
+    Wildcard actions fan out over every attr, key or index of the object
+    they're applied to. The ``action`` of each yielded node is the concrete
+    action that reached it, never a wildcard. Nodes are yielded depth-first,
+    in iteration order.
+    """
+    return _iter_nodes(data, tuple(map(_expander, actions)))
+
+
+def _iter_nodes(data, expanders):
+    """Implement ``iter_nodes()`` with the ``_expander()`` of each action."""
+    if not expanders:
+        yield DataNode(value=data, action=None, parent=None)
+        return
+
+    last = len(expanders) - 1
+    stack = [(0, data, expanders[0](data))]
+
+    while stack:
+        depth, parent, matches = stack[-1]
+        for action, value in matches:
+            if depth == last:
+                yield DataNode(value=value, action=action, parent=parent)
+            else:
+                child_matches = expanders[depth + 1](value)
+                stack.append((depth + 1, value, child_matches))
+                break
+        else:
+            stack.pop()
+
+
+def _first_node(data, expanders):
+    """Return the first node of ``_iter_nodes()``, or ``_MISSING``.
+
+    Unlike ``_iter_nodes()``, a branch that raises one of ``LOOKUP_ERRORS``
+    is skipped instead of ending the traversal.
+    """
+    last = len(expanders) - 1
+    stack = [(0, data, _safe_expand(expanders[0], data))]
+
+    while stack:
+        depth, parent, matches = stack[-1]
+        try:
+            action, value = next(matches)
+        except (StopIteration, *LOOKUP_ERRORS):
+            stack.pop()
+            continue
+        if depth == last:
+            return DataNode(value=value, action=action, parent=parent)
+        child_matches = _safe_expand(expanders[depth + 1], value)
+        stack.append((depth + 1, value, child_matches))
+
+    return _MISSING
+
+
+def _safe_expand(expander, data):
+    try:
+        return expander(data)
+    except LOOKUP_ERRORS:
+        return iter(())
+
+
+def _expander(action):
+    """Return a callable equivalent to ``partial(expand, action=action)``.
+
+    Concrete actions are bound to their ``getter()`` up front, so each step
+    of a fan-out traversal skips the accessor dispatch in ``pick()``.
+    """
+    if is_fan_out(action):
+        return partial(expand, action=action)
+    return partial(_expand_one, action, getter(action))
+
+
+def _expand_one(action, get, data):
+    return iter(((action, get(data)),))
+
+
+def expand(data, action):
+    """Yield ``(action, value)`` for every match of ``action`` in ``data``.
+
+    Concrete actions match exactly once. Wildcard actions are replaced with
+    one concrete action per match, and filter actions with one per child of
+    ``data`` (see ``children()``) that passes the filter.
+    """
+    if isinstance(action.item, Filter):
+        yield from filter(lambda child: action.item(child[1]), children(data))
+    elif action.item is not WILDCARD:
+        yield action, pick(data, action)
+    elif action.accessor is Accessor.KEY:
+        for key, value in data.items():
+            yield Action(key, Accessor.KEY), value
+    elif action.accessor is Accessor.INDEX:
+        for i, value in enumerate(data):
+            yield Action(i, Accessor.INDEX), value
+    elif action.accessor is Accessor.ATTR:
+        for name in attr_names(data):
+            yield Action(name, Accessor.ATTR), getattr(data, name)
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def attr_names(obj):
+    """Return the names of the instance attributes of ``obj``.
+
+    This includes names from the instance ``__dict__`` as well as any
+    ``__slots__`` that are currently set.
+    """
+    names = list(getattr(obj, "__dict__", ()))
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(
+            name
+            for name in slots
+            if name not in ("__dict__", "__weakref__") and hasattr(obj, name)
+        )
+    if not names and not hasattr(obj, "__dict__"):
+        raise TypeError(
+            f"'{type(obj).__name__}' object has no instance attributes"
+        )
+    return names
+
+
+def children(data):
+    """Yield ``(action, value)`` for each child of ``data``.
+
+    Mappings have KEY children, sequences (except strings and bytes) have
+    INDEX children, and records (``SimpleNamespace`` and dataclass
+    instances) have ATTR children. Any other object is a leaf and has no
+    children.
+    """
+    accessor = container_accessor(data)
+    if accessor is None:
+        return iter(())
+    return expand(data, Action(WILDCARD, accessor))
+
+
+def container_accessor(data):
+    """Return the ``Accessor`` used to reach the children of ``data``.
+
+    Returns None if ``data`` is a leaf. See ``children()``.
+
+    The result depends only on the type of ``data``, so it is cached by
+    type: the ``Mapping``/``Sequence`` and dataclass checks are made once
+    for each of the last ``TYPE_CACHE_SIZE`` types seen.
+    """
+    return _container_accessor(type(data))
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def _container_accessor(cls):
+    if issubclass(cls, Mapping):
+        return Accessor.KEY
+    if issubclass(cls, Sequence) and not issubclass(cls, SCALAR_SEQUENCES):
+        return Accessor.INDEX
+    if issubclass(cls, SimpleNamespace) or (
+        dataclasses.is_dataclass(cls) and not issubclass(cls, type)
+    ):
+        return Accessor.ATTR
+    return None
+
+
+def track(data):
+    """Wrap ``data`` in a proxy that records the path of every mutation.
+
+    Reading a container (see ``children()``) through the proxy returns a
+    proxy for it too, so writes made anywhere below the root, whether by
+    item or attribute assignment on a child proxy or by calling ``set()``,
+    ``update()`` or ``delete()`` on the root proxy, are recorded. Call
+    ``dirty_paths()`` on any proxy to get the changed paths.
+
+    Args:
+        data: Compound data structure to track. It is modified in place
+            through the proxy.
+
+    Returns:
+        A proxy for ``data``.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> doc = nested.track({'a': {'b': 1}, 'c': [1, 2]})
+        >>> doc['a']['b'] = 2
+        >>> _ = nested.set(doc, '[c]#0', 5)
+        >>> sorted(doc.dirty_paths())
+        ['[a][b]', '[c]#0']
+    """
+    return _track(data, (), builtins.set())
+
+
+def _track(data, path, dirty):
+    accessor = container_accessor(data)
+    if accessor is Accessor.KEY and isinstance(data, MutableMapping):
+        return TrackedMapping(data, path, dirty)
+    if accessor is Accessor.INDEX and isinstance(data, MutableSequence):
+        return TrackedSequence(data, path, dirty)
+    if accessor is Accessor.ATTR:
+        return TrackedObject(data, path, dirty)
+    return data
+
+
+class Tracked:
+    """Base class for the proxies returned by ``track()``."""
+
+    __slots__ = ("_tracked_data", "_tracked_path", "_tracked_dirty")
+
+    def __init__(self, data, path, dirty):
+        object.__setattr__(self, "_tracked_data", data)
+        object.__setattr__(self, "_tracked_path", path)
+        object.__setattr__(self, "_tracked_dirty", dirty)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._tracked_data!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, Tracked):
+            other = other._tracked_data
+        return self._tracked_data == other
+
+    __hash__ = None
+
+    def dirty_paths(self):
+        """Return the set of paths that have been changed.
+
+        Paths below another changed path are left out, since writing the
+        ancestor covers them.
+        """
+        dirty = sorted(self._tracked_dirty, key=len)
+        kept = []
+        for path in dirty:
+            if not any(path[: len(prefix)] == prefix for prefix in kept):
+                kept.append(path)
+
+        return {format_path(path) for path in kept}
+
+    def mark_clean(self):
+        """Forget every recorded change."""
+        self._tracked_dirty.clear()
+
+    def _child(self, action, value):
+        path = self._tracked_path + (action,)
+        return _track(value, path, self._tracked_dirty)
+
+    def _mark(self, action):
+        self._tracked_dirty.add(self._tracked_path + (action,))
+
+
+class TrackedMapping(Tracked, MutableMapping):
+    """Proxy for a mutable mapping. See ``track()``."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = self._tracked_data[key]
+        return self._child(Action(key, Accessor.KEY), value)
+
+    def __setitem__(self, key, value):
+        self._tracked_data[key] = value
+        self._mark(Action(key, Accessor.KEY))
+
+    def __delitem__(self, key):
+        del self._tracked_data[key]
+        self._mark(Action(key, Accessor.KEY))
+
+    def __iter__(self):
+        return iter(self._tracked_data)
+
+    def __len__(self):
+        return len(self._tracked_data)
+
+
+class TrackedSequence(Tracked, MutableSequence):
+    """Proxy for a mutable sequence. See ``track()``.
+
+    Inserting or deleting an item shifts the items after it, so those
+    operations mark the whole sequence as changed.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        value = self._tracked_data[index]
+        if isinstance(index, slice):
+            return value
+        action = Action(self._normalize(index), Accessor.INDEX)
+        return self._child(action, value)
+
+    def __setitem__(self, index, value):
+        self._tracked_data[index] = value
+        if isinstance(index, slice):
+            self._mark_all()
+        else:
+            self._mark(Action(self._normalize(index), Accessor.INDEX))
+
+    def __delitem__(self, index):
+        del self._tracked_data[index]
+        self._mark_all()
+
+    def __len__(self):
+        return len(self._tracked_data)
+
+    def insert(self, index, value):
+        self._tracked_data.insert(index, value)
+        self._mark_all()
+
+    def _normalize(self, index):
+        return index + len(self._tracked_data) if index < 0 else index
+
+    def _mark_all(self):
+        self._tracked_dirty.add(self._tracked_path)
+
+
+class TrackedObject(Tracked):
+    """Proxy for an object with attributes. See ``track()``."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        value = getattr(self._tracked_data, name)
+        return self._child(Action(name, Accessor.ATTR), value)
+
+    def __setattr__(self, name, value):
+        setattr(self._tracked_data, name, value)
+        self._mark(Action(name, Accessor.ATTR))
+
+    def __delattr__(self, name):
+        delattr(self._tracked_data, name)
+        self._mark(Action(name, Accessor.ATTR))
+
+
+class PathIndex:
+    """An index of every node in a nested data structure, keyed by path.
+
+    The structure is walked once on construction. Afterwards, looking up a
+    path is a single dict lookup plus a single action, regardless of how
+    deep the path is.
+
+    Keys are tuples of ``Action`` objects, exactly as produced by
+    ``parse_actions()``, and every method accepts either such a tuple or a
+    path string. Negative indexes are resolved against the length of their
+    sequence before the lookup, so ``#-1`` finds the last item. Only nodes
+    reachable through ``children()`` are indexed.
+
+    The index is kept consistent with the data as long as every write goes
+    through the index's own ``set()`` and ``delete()`` methods. Writing to
+    the data directly leaves the index stale.
+
+    Args:
+        data: Compound data structure to index.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> index = nested.PathIndex({'a': {'b': [1, 2]}})
+        >>> index.get('[a][b]#1')
+        2
+        >>> index.set('[a][b]', {'c': 3}).get('[a][b][c]')
+        3
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._nodes = {}
+        self._add(data, ())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.data!r})"
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __contains__(self, path):
+        return self._key(path) in self._nodes
+
+    def get(self, path, default=_MISSING):
+        """Fetch the value at ``path``.
+
+        Raises:
+            KeyError: If ``path`` isn't indexed and no default was given.
+        """
+        return self.get_with_context(path, default).value
+
+    def get_with_context(self, path, default=_MISSING):
+        """Fetch the ``DataNode`` at ``path``.
+
+        Raises:
+            KeyError: If ``path`` isn't indexed and no default was given.
+        """
+        return self._node(self._key(path), path, default)
+
+    def set(self, path, value):
+        """Replace the value at ``path`` and re-index it.
+
+        Returns:
+            The index itself, to allow method chaining.
+        """
+        key = self._key(path)
+        if not key:
+            _empty_path()
+        node = self._node(key, path)
+        stale = self._descendants(node.value, key)
+        put(node.parent, node.action, value)
+        self._discard(stale)
+        self._add(value, key)
+
+        return self
+
+    def delete(self, path):
+        """Delete the value at ``path`` and drop it from the index.
+
+        Deleting an item from a sequence shifts the index of every later
+        item, so in that case the whole sequence is re-indexed.
+
+        Returns:
+            The index itself, to allow method chaining.
+        """
+        key = self._key(path)
+        if not key:
+            _empty_path()
+        node = self._node(key, path)
+
+        if node.action.accessor is Accessor.INDEX:
+            stale = self._descendants(node.parent, key[:-1])
+            rm(node.parent, node.action)
+            self._discard(stale)
+            self._add(node.parent, key[:-1])
+        else:
+            stale = self._descendants(node.value, key)
+            rm(node.parent, node.action)
+            self._discard(stale)
+            del self._nodes[key]
+
+        return self
+
+    def _add(self, data, prefix):
+        """Index every descendant of ``data``, which lives at ``prefix``."""
+        nodes = self._nodes
+        stack = [(data, prefix)]
+
+        while stack:
+            parent, prefix = stack.pop()
+            for action, value in children(parent):
+                key = prefix + (action,)
+                nodes[key] = (parent, action)
+                stack.append((value, key))
+
+    def _descendants(self, data, prefix):
+        """Return the keys of every descendant of ``data`` at ``prefix``.
+
+        The keys are collected before a write, so they can be dropped from
+        the index only once the write has succeeded.
+        """
+        keys = []
+        stack = [(data, prefix)]
+
+        while stack:
+            parent, prefix = stack.pop()
+            for action, value in children(parent):
+                key = prefix + (action,)
+                keys.append(key)
+                stack.append((value, key))
+
+        return keys
+
+    def _discard(self, keys):
+        """Drop ``keys`` from the index."""
+        nodes = self._nodes
+        for key in keys:
+            nodes.pop(key, None)
+
+    def _node(self, key, path, default=_MISSING):
+        """Fetch the ``DataNode`` at the normalized ``key`` of ``path``."""
+        if not key:
+            return DataNode(self.data, None, None)
+        try:
+            parent, action = self._nodes[key]
+        except KeyError:
+            if default is _MISSING:
+                raise KeyError(path) from None
+            return DataNode(default, None, None)
+
+        return DataNode(pick(parent, action), action, parent)
+
+    def _key(self, path):
+        """Return the key of ``path``, with negative indexes resolved."""
+        key = path if isinstance(path, tuple) else compile(path).actions
+
+        for i, action in enumerate(key):
+            if action.accessor is not Accessor.INDEX:
+                continue
+            if not isinstance(action.item, int) or action.item >= 0:
+                continue
+            prefix = key[:i]
+            if prefix and prefix not in self._nodes:
+                break
+            sequence = self._node(prefix, path).value
+            try:
+                size = len(sequence)
+            except TypeError:
+                break
+            if action.item + size >= 0:
+                action = Action(action.item + size, Accessor.INDEX)
+                key = (*prefix, action, *key[i + 1 :])
+
+        return key
+
+
+def pick(data, action):
+    if action.accessor is Accessor.ATTR:
+        return getattr(data, action.item)
+    elif action.accessor is Accessor.KEY:
+        return data[action.item]
+    elif action.accessor is Accessor.INDEX:
+        index = subscript(action.item)
+        if type(index) is slice:
+            return slice_view(data, index)
+        return data[index]
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def put(data, action, value):
+    if action.accessor is Accessor.ATTR:
+        setattr(data, action.item, value)
+    elif action.accessor is Accessor.KEY:
+        data[action.item] = value
+    elif action.accessor is Accessor.INDEX:
+        data[subscript(action.item)] = value
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def put_padded(data, action, value):
+    """Like ``put()``, but pad lists with None up to a missing INDEX."""
+    if (
+        action.accessor is Accessor.INDEX
+        and isinstance(action.item, int)
+        and isinstance(data, MutableSequence)
+    ):
+        missing = action.item - len(data)
+        if missing >= 0:
+            data.extend([None] * missing)
+            data.append(value)
+            return
+    put(data, action, value)
+
+
+def subscript(item):
+    """Return the object that INDEX ``item`` subscripts a container with.
+
+    ``Slice`` items, including those in a tuple, become ``slice`` objects,
+    and any other item that isn't a tuple or slice is converted to ``int``.
+    """
+    if type(item) is int:
+        return item
+    if isinstance(item, Slice):
+        return slice(*item)
+    if isinstance(item, tuple):
+        return tuple(map(subscript, item))
+    if isinstance(item, slice):
+        return item
+    return int(item)
+
+
+def slice_view(data, index):
+    """Return ``data[index]`` for the slice ``index``, avoiding a copy.
+
+    Buffers (see ``BUFFER_SEQUENCES``) are sliced through a ``memoryview``
+    and lists and tuples (see ``VIEW_SEQUENCES``) through a ``ListView``.
+    Both read and write through to ``data``. Other objects are sliced as
+    usual. Note that while a ``memoryview`` of a ``bytearray`` or
+    ``array.array`` is alive, the buffer can't change size.
+    """
+    if isinstance(data, BUFFER_SEQUENCES):
+        return memoryview(data)[index]
+    if isinstance(data, VIEW_SEQUENCES) or type(data) is ListView:
+        return ListView(data, index)
+    return data[index]
+
+
+def rm(data, action):
+    if action.accessor is Accessor.ATTR:
+        delattr(data, action.item)
+    elif action.accessor is Accessor.KEY:
+        del data[action.item]
+    elif action.accessor is Accessor.INDEX:
+        del data[subscript(action.item)]
+    else:
+        raise ValueError(
+            "PROGRAM ERROR: unexpected accessor" f" `{action.accessor}`"
+        )
+
+
+def parse_actions(path):
+    """Attempt to parse a string into actions for modifying an object.
+
+    The whole path is tokenized by a single ``finditer()`` over
+    ``PATH_TOKEN``, which matches one complete accessor at a time and
+    captures its parameter in a group that identifies the accessor.
+    Parameters may be quoted with ``"`` or ``'`` to include operator chars,
+    and any char may be escaped with a backslash. A quoted ``*`` is a
+    literal key rather than a wildcard, and ``[]`` is the empty key. INDEX
+    parameters are converted to an ``int`` (which may be negative), a
+    ``Slice`` or a tuple here, once (see ``parse_index()``).
+    Filter expressions (``[?...]``) are compiled into a ``Filter`` here,
+    once.
+
+    Paths without quotes, escapes or filters are tokenized by the simpler
+    ``PLAIN_PATH_TOKEN`` in ``_parse_plain_actions()`` instead. If the
+    tokens don't cover the whole path, it's scanned again by
+    ``_scan_actions()`` to raise an error describing what's wrong.
+    """
+    if NOT_PLAIN_CHARS.search(path) is None:
+        return _parse_plain_actions(path)
+    actions = []
+    append = actions.append
+    pos = 0
+
+    for match in PATH_TOKEN.finditer(path):
+        if match.start() != pos:
+            return _scan_actions(path)
+        pos = match.end()
+        group = match.lastindex
+        item = match.group(group)
+        accessor, quoted = PATH_TOKEN_KINDS[group]
+
+        if group == FILTER_GROUP:
+            item = Filter(item)
+        elif "\\" in item:
+            item = ESCAPE.sub(r"\1", item)
+        elif not quoted and item == WILDCARD_CHAR:
+            item = WILDCARD
+        if accessor is Accessor.INDEX and item is not WILDCARD:
+            item = parse_index(item)
+        # Skip the namedtuple's keyword-handling ``__new__``
+        append(_new_action((item, accessor)))
+
+    if pos != len(path):
+        return _scan_actions(path)
+    return actions
+
+
+def _parse_plain_actions(path):
+    actions = []
+    append = actions.append
+    pos = 0
+
+    for match in PLAIN_PATH_TOKEN.finditer(path):
+        if match.start() != pos:
+            return _scan_actions(path)
+        pos = match.end()
+        group = match.lastindex
+        item = match.group(group)
+        accessor = PLAIN_PATH_TOKEN_ACCESSORS[group]
+
+        if item == WILDCARD_CHAR:
+            item = WILDCARD
+        elif accessor is Accessor.INDEX:
+            item = parse_index(item)
+        append(_new_action((item, accessor)))
+
+    if pos != len(path):
+        return _scan_actions(path)
+    return actions
+
+
+def _scan_actions(path):
+    """Parse ``path`` one accessor at a time, raising on the first error.
+
+    This is slower than ``parse_actions()``, but knows what was expected at
+    each position, so it's only used to report errors.
+    """
+    actions = []
+    pos = 0
+    end = len(path)
+
+    while pos < end:
+        char = path[pos]
+        accessor = LHS_OPS.get(char)
+        if accessor is None:
+            raise MissingLHSOperator(char)
+        pos += 1
+
+        if accessor is Accessor.KEY and path.startswith("?", pos):
+            match = FILTER_PARAM.match(path, pos)
+            if match is None:
+                raise InvalidFilter(path[pos:], "expected an expression")
+            pos = match.end()
+            if pos >= end or path[pos] != RHS_OPS[accessor]:
+                raise MissingRHSOperator(accessor, char)
+            actions.append(Action(Filter(match.group(1)), accessor))
+            pos += 1
+            continue
+        if pos < end and path[pos] in QUOTE_CHARS:
+            match = QUOTED_PARAM.match(path, pos)
+            if match is None:
+                raise UnterminatedQuote(path[pos])
+            item = match.group(2)
+            quoted = True
+        else:
+            match = BARE_PARAM.match(path, pos)
+            if match is None and accessor is Accessor.KEY:
+                match = EMPTY_PARAM.match(path, pos)
+            if match is None:
+                raise MissingValueChar(accessor)
+            item = match.group()
+            quoted = False
+        if "\\" in item:
+            item = ESCAPE.sub(r"\1", item)
+        pos = match.end()
+
+        rhs_op_char = RHS_OPS.get(accessor)
+        if rhs_op_char:
+            if pos >= end or path[pos] != rhs_op_char:
+                raise MissingRHSOperator(accessor, char)
+            pos += 1
+        elif pos < end and path[pos] in RHS_OP_CHARS:
+            raise UnexpectedRHSOperator(path[pos])
+
+        actions.append(make_action(item, accessor, quoted))
+
+    return actions
+
+
+_new_action = partial(tuple.__new__, Action)
+
+
+def make_action(item, accessor, quoted=False):
+    """Create an ``Action`` from a parsed item and its accessor."""
+    if item == WILDCARD_CHAR and not quoted:
+        return Action(WILDCARD, accessor)
+    if accessor is Accessor.INDEX:
+        return Action(parse_index(item), accessor)
+    return Action(item, accessor)
+
+
+def parse_index(param):
+    """Convert an INDEX parameter to an int, a ``Slice`` or a tuple of them.
+
+    Raises:
+        InvalidIndex: If ``param`` is none of these.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.parse_index('-1')
+        -1
+        >>> nested.parse_index('::2')
+        Slice(start=None, stop=None, step=2)
+        >>> nested.parse_index('3,1:')
+        (3, Slice(start=1, stop=None, step=None))
+    """
+    try:
+        return int(param)
+    except ValueError:
+        pass
+    if "," not in param:
+        return _parse_index_part(param, param)
+    parts = param.split(",")
+    if not parts[-1]:
+        # A trailing comma, as in ``3,``
+        parts.pop()
+    return tuple(_parse_index_part(part, param) for part in parts)
+
+
+def _parse_index_part(part, param):
+    bounds = part.split(":")
+    try:
+        if len(bounds) == 1:
+            return int(part)
+        if len(bounds) <= 3:
+            return Slice(*(int(bound) if bound else None for bound in bounds))
+    except ValueError:
+        pass
+    raise InvalidIndex(param)
+
+
+def _format_index(item):
+    if isinstance(item, (Slice, slice)):
+        start, stop, step = (
+            "" if bound is None else str(int(bound))
+            for bound in (item.start, item.stop, item.step)
+        )
+        return f"{start}:{stop}:{step}" if step else f"{start}:{stop}"
+    if isinstance(item, tuple):
+        parts = ",".join(map(_format_index, item))
+        return parts + "," if len(item) == 1 else parts
+    return str(int(item))
+
+
+def format_path(actions):
+    """Format a sequence of actions as a path string.
+
+    This is the inverse of ``parse_actions()``: parsing the result gives
+    back equal actions. Parameters are quoted where needed.
+
+    Examples:
+        >>> from miscutils import nested
+        >>> nested.format_path(nested.parse_actions('["a.b"]#-1.c'))
+        '["a.b"]#-1.c'
+    """
+    parts = []
+
+    for action in actions:
+        item = action.item
+        if isinstance(item, Filter):
+            parts.append(f"[?{item.source}]")
+            continue
+        if action.accessor is Accessor.INDEX:
+            param = WILDCARD_CHAR if item is WILDCARD else _format_index(item)
+        elif item is WILDCARD:
+            param = WILDCARD_CHAR
+        elif not isinstance(item, str):
+            raise TypeError(f"cannot format non-string item: {item!r}")
+        elif not item or item == WILDCARD_CHAR or NEEDS_QUOTES.search(item):
+            escaped = item.replace("\\", "\\\\").replace('"', '\\"')
+            param = f'"{escaped}"'
+        else:
+            param = item
+        if action.accessor is Accessor.ATTR:
+            parts.append(f".{param}")
+        elif action.accessor is Accessor.KEY:
+            parts.append(f"[{param}]")
+        else:
+            parts.append(f"#{param}")
+
+    return "".join(parts)
+
+
+class Error(Exception):
+    """Base class for errors in this module."""
+
+
+class MissingRHSOperator(Error):
+    def __init__(self, op, char):
+        super().__init__(
+            f"missing rhs operator: accessor started with char '{char}':"
+            f" expected rhs op char '{RHS_OPS[op]}'"
+        )
+
+
+class MissingLHSOperator(Error):
+
+    lhs_ops_repr = " , ".join(f"'{char}'" for char in LHS_OPS.keys())
+
+    def __init__(self, char):
+        super().__init__(
+            f"missing lhs operator: expected an lhs operator char"
+            f" but found '{char}' (must be one of: {self.lhs_ops_repr})"
+        )
+
+
+class UnexpectedRHSOperator(Error):
+    def __init__(self, char):
+        super().__init__(f"unexpected rhs operator `{char}`")
+
+
+class UnterminatedQuote(Error):
+    def __init__(self, char):
+        super().__init__(f"unterminated quote `{char}`")
+
+
+class InvalidFilter(Error, ValueError):
+    def __init__(self, source, reason):
+        super().__init__(f"invalid filter `{source}`: {reason}")
+
+
+class InvalidIndex(Error, ValueError):
+    def __init__(self, item):
+        super().__init__(
+            f"index parameter is not an integer, slice or tuple: `{item}`"
+        )
 
 
 class MissingValueChar(Error):
@@ -0,0 +1,299 @@
+"""nested_json - retrieve nested values from JSON documents incrementally
+
+``stream_get(fp, paths)`` takes paths in the ``nested`` path DSL and
+retrieves their values from a JSON document by tokenizing it incrementally,
+without loading all of it.
+"""
+import io
+import json
+import re
+
+from miscutils.nested import (
+    _MISSING,
+    Accessor,
+    Action,
+    _compile_trie,
+    _path_defaults,
+)
+
+__all__ = ["stream_get", "JSONScanner"]
+
+# Number of bytes read at a time by ``stream_get``
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def stream_get(fp, paths, default=_MISSING, defaults=None, as_dict=False):
+    """Fetch nested values from a JSON document without loading all of it.
+
+    The document is tokenized incrementally from ``fp``. Subtrees that no
+    path leads into are skipped without being decoded, only the values at
+    ``paths`` are materialized, and reading stops as soon as every path has
+    been resolved.
+
+    Only KEY and INDEX actions can be used, since JSON has no attributes,
+    and INDEX items must be non-negative integers, since the length of an
+    array is not known until it has been read. Wildcards, slices and
+    tuples of indexes aren't supported.
+
+    Args:
+        fp: Binary file-like object (anything with a ``read(size)`` method,
+            including ``mmap.mmap``) or a bytes-like object.
+        paths (iterable): Paths to the target values in the document.
+        default: Value to return for any path that isn't in the document.
+            If omitted, a ``KeyError`` is raised instead.
+        defaults (dict): Per-path defaults, keyed by path. These take
+            precedence over ``default``.
+        as_dict (bool): If True, return a dict mapping each path to its
+            value instead of a tuple.
+
+    Returns:
+        A tuple of values in the same order as ``paths``, or a dict if
+        ``as_dict`` is True.
+
+    Raises:
+        ValueError: If the document isn't valid JSON (as far as it was
+            read) or a path can't be used with JSON.
+
+    Examples:
+        >>> import io
+        >>> from miscutils.nested_json import stream_get
+        >>> fp = io.BytesIO(b'{"a": [1, {"b": 2}], "c": {"d": 3}}')
+        >>> stream_get(fp, ['[a]#1[b]', '[c]'])
+        (2, {'d': 3})
+    """
+    paths = tuple(paths)
+    trie = _compile_trie(paths)
+    for path in trie.paths:
+        for action in path.actions:
+            if action.accessor is Accessor.ATTR or (
+                action.accessor is Accessor.INDEX
+                and not _is_json_index(action.item)
+            ):
+                raise ValueError(f"path can't be used with JSON: {path.path}")
+
+    if isinstance(fp, (bytes, bytearray, memoryview)):
+        fp = io.BytesIO(fp)
+    values = [_MISSING] * len(paths)
+    defaults = _path_defaults(paths, default, defaults)
+    JSONScanner(fp).extract(trie, values, defaults)
+
+    for i, value in enumerate(values):
+        if value is _MISSING:
+            if defaults[i] is _MISSING:
+                raise KeyError(paths[i])
+            values[i] = defaults[i]
+
+    if as_dict:
+        return dict(zip(paths, values))
+    return tuple(values)
+
+
+def _is_json_index(item):
+    return isinstance(item, int) and item >= 0
+
+
+class JSONScanner:
+    """Incremental tokenizer for extracting parts of a JSON document.
+
+    The scanner keeps only an unconsumed window of the document in memory,
+    refilling it from ``fp`` one chunk at a time. See ``stream_get()``.
+
+    Args:
+        fp: Binary file-like object to read the document from.
+        chunk_size (int): Number of bytes to read at a time.
+    """
+
+    _WHITESPACE = re.compile(rb"[ \t\n\r]*")
+    _STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+    _SCALAR = re.compile(rb"[^\s,\]}]+")
+    _STRUCTURAL = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}"]', re.DOTALL)
+    _QUOTE = ord('"')
+
+    def __init__(self, fp, chunk_size=JSON_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+
+    def extract(self, trie, values, defaults):
+        """Resolve every path in ``trie`` against the document.
+
+        Values are written into ``values``. Paths that aren't in the
+        document are left as ``_MISSING``.
+        """
+        self._pending = len(trie.paths)
+        try:
+            self._visit(trie.root, trie, values, defaults)
+        except _Resolved:
+            pass
+
+    def _visit(self, node, trie, values, defaults):
+        if node.terminals or not node.children:
+            value = self._decode_value()
+            trie.resolve_node(node, value, values, defaults)
+            self._pending -= len(node.indices)
+            if not self._pending:
+                raise _Resolved()
+            return
+
+        char = self._peek()
+        if char == ord("{"):
+            self.pos += 1
+            if self._peek() == ord("}"):
+                self.pos += 1
+                return
+            while True:
+                key = self._string()
+                self._expect(b":")
+                child = node.children.get(Action(key, Accessor.KEY))
+                if child is None:
+                    self._skip_value()
+                else:
+                    self._visit(child, trie, values, defaults)
+                if self._separator(b"}"):
+                    return
+        elif char == ord("["):
+            self.pos += 1
+            if self._peek() == ord("]"):
+                self.pos += 1
+                return
+            i = 0
+            while True:
+                child = node.children.get(Action(i, Accessor.INDEX))
+                if child is None:
+                    self._skip_value()
+                else:
+                    self._visit(child, trie, values, defaults)
+                if self._separator(b"]"):
+                    return
+                i += 1
+        else:
+            self._skip_value()
+
+    def _fill(self):
+        """Read the next chunk into the buffer. Return False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # Discard consumed input, unless it's part of a value being decoded
+        keep = self.pos if self.mark is None else self.mark
+        self.buffer = self.buffer[keep:] + chunk
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark -= keep
+        return True
+
+    def _peek(self):
+        """Skip whitespace and return the next byte, or None at EOF."""
+        while True:
+            self.pos = self._WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char[0]:
+            raise self._error(f"expected {char.decode()!r}")
+        self.pos += 1
+
+    def _separator(self, close):
+        """Consume a ``,`` or ``close``. Return True if it was ``close``."""
+        char = self._peek()
+        if char == close[0]:
+            self.pos += 1
+            return True
+        self._expect(b",")
+        return False
+
+    def _token(self, pattern, terminated):
+        """Consume and return a token matching ``pattern``.
+
+        Unless the token is ``terminated`` (i.e. it can't be a prefix of a
+        longer token), the buffer is refilled until the match stops short
+        of its end.
+        """
+        while True:
+            match = pattern.match(self.buffer, self.pos)
+            if match and (terminated or match.end() < len(self.buffer)):
+                break
+            if not self._fill():
+                if match is None:
+                    raise self._error("invalid token")
+                break
+        self.pos = match.end()
+        return match.group()
+
+    def _string(self):
+        if self._peek() != ord('"'):
+            raise self._error("expected a string")
+        raw = self._token(self._STRING, terminated=True)
+        if b"\\" in raw:
+            return json.loads(raw)
+        return raw[1:-1].decode()
+
+    def _skip_value(self):
+        """Consume the next value without decoding it."""
+        char = self._peek()
+        if char is None:
+            raise self._error("unexpected end of document")
+        if char == ord('"'):
+            self._token(self._STRING, terminated=True)
+        elif char not in b"[{":
+            self._token(self._SCALAR, terminated=False)
+        else:
+            self._skip_container()
+
+    def _skip_container(self):
+        """Consume the array or object at the current position.
+
+        Strings are matched whole by ``_STRUCTURAL`` so brackets inside them
+        are ignored. A lone quote is an unterminated string, which means the
+        buffer has to be refilled before scanning can continue.
+        """
+        depth = 0
+        while True:
+            buffer = self.buffer
+            for match in self._STRUCTURAL.finditer(buffer, self.pos):
+                start = match.start()
+                if match.end() - start != 1:
+                    continue
+                char = buffer[start]
+                if char == self._QUOTE:
+                    self.pos = start
+                    break
+                depth += 1 if char in b"[{" else -1
+                if not depth:
+                    self.pos = start + 1
+                    return
+            else:
+                self.pos = len(buffer)
+            if not self._fill():
+                raise self._error("unexpected end of document")
+
+    def _decode_value(self):
+        """Consume and decode the next value."""
+        self._peek()
+        self.mark = self.pos
+        try:
+            self._skip_value()
+            raw = self.buffer[self.mark : self.pos]
+        finally:
+            self.mark = None
+        try:
+            return json.loads(raw)
+        except ValueError as exc:
+            raise self._error(str(exc)) from None
+
+    def _error(self, message):
+        return ValueError(f"invalid JSON document: {message}")
+
+
+class _Resolved(Exception):
+    """Raised by ``JSONScanner`` to stop once every path is resolved."""
@@ -0,0 +1,347 @@
+"""nested_lazy - nested documents kept in a key-value store
+
+``LazyDocument(store)`` is a document whose dicts and lists are stored as
+separate nodes in any mutable mapping, such as a ``shelve.Shelf`` or a
+``SQLiteStore``, and loaded on demand. It works with every function in
+``miscutils.nested``.
+"""
+import pickle
+import sqlite3
+import uuid
+from collections import OrderedDict, namedtuple
+from collections.abc import MutableMapping, MutableSequence
+
+__all__ = ["LazyDocument", "SQLiteStore"]
+
+# Maximum number of nodes a ``LazyDocument`` keeps in memory
+LAZY_CACHE_SIZE = 1024
+
+# Store key of the root node of a ``LazyDocument``
+LAZY_ROOT_ID = "root"
+
+
+class NodeRef(namedtuple("NodeRef", "id")):
+    """Reference to a child node stored separately by a ``LazyDocument``."""
+
+    __slots__ = ()
+
+
+class LazyNode:
+    """Base class for proxies of the nodes of a ``LazyDocument``.
+
+    Nodes are looked up in the document by id on every access, so a proxy
+    stays valid even after its node has been evicted from memory.
+    """
+
+    __slots__ = ("_doc", "_id")
+
+    def __init__(self, doc, node_id):
+        self._doc = doc
+        self._id = node_id
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.materialize()!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, LazyNode):
+            other = other.materialize()
+        return self.materialize() == other
+
+    __hash__ = None
+
+    def materialize(self):
+        """Load this node and all of its descendants as plain objects."""
+        return self._doc._materialize(NodeRef(self._id))
+
+    def _node(self):
+        return self._doc._load(self._id)
+
+    def _wrap(self, value):
+        if isinstance(value, NodeRef):
+            return self._doc._proxy(value)
+        return value
+
+    def _writable(self):
+        """Load this node to be changed in place.
+
+        Call this only after encoding any new values, since encoding may
+        evict this node from memory.
+        """
+        self._doc._mark_dirty(self._id)
+        return self._doc._load(self._id)
+
+    def _discard(self, old):
+        if isinstance(old, NodeRef):
+            self._doc._drop(old)
+
+
+class LazyMapping(LazyNode, MutableMapping):
+    """Proxy for a mapping node of a ``LazyDocument``."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self._wrap(self._node()[key])
+
+    def __setitem__(self, key, value):
+        value = self._doc._encode(value)
+        node = self._writable()
+        old = node.get(key)
+        node[key] = value
+        self._discard(old)
+
+    def __delitem__(self, key):
+        self._discard(self._writable().pop(key))
+
+    def __iter__(self):
+        return iter(list(self._node()))
+
+    def __len__(self):
+        return len(self._node())
+
+
+class LazySequence(LazyNode, MutableSequence):
+    """Proxy for a list node of a ``LazyDocument``."""
+
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._wrap(value) for value in self._node()[index]]
+        return self._wrap(self._node()[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment isn't supported")
+        value = self._doc._encode(value)
+        node = self._writable()
+        old = node[index]
+        node[index] = value
+        self._discard(old)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            raise TypeError("slice deletion isn't supported")
+        self._discard(self._writable().pop(index))
+
+    def __len__(self):
+        return len(self._node())
+
+    def insert(self, index, value):
+        value = self._doc._encode(value)
+        self._writable().insert(index, value)
+
+
+class LazyDocument(LazyMapping):
+    """A document kept in a key-value store and loaded on demand.
+
+    Every dict and list in the document is stored as a separate node under
+    its own key in ``store``, with child containers replaced by ``NodeRef``
+    objects. Nodes are loaded as ``get()``/``set()`` (or plain item access)
+    traverse them, and at most ``cache_size`` of them are kept in memory at
+    once, least recently used first out. Changed nodes are written back to
+    the store when they are evicted and on ``flush()``.
+
+    The document itself is a proxy for the root mapping, and child
+    containers are returned as ``LazyMapping`` and ``LazySequence`` proxies,
+    so the functions in ``miscutils.nested`` work on it unchanged.
+
+    Args:
+        store: Mutable mapping from string keys to stored nodes, such as a
+            ``shelve.Shelf`` or a ``SQLiteStore``.
+        cache_size (int): Maximum number of nodes kept in memory. Must be
+            at least 1, since nodes are changed while in memory.
+        root (str): Key of the root node in ``store``. It is created as an
+            empty mapping if it doesn't exist.
+
+    Examples:
+        >>> import shelve
+        >>> from miscutils import nested
+        >>> from miscutils.nested_lazy import LazyDocument
+        >>> with shelve.open('doc.db') as store:
+        ...     doc = LazyDocument.build(store, {'a': {'b': [1, 2]}})
+        ...     _ = nested.set(doc, '[a][b]#0', 5)
+        ...     doc.flush()
+    """
+
+    __slots__ = ("store", "cache_size", "_resident", "_dirty")
+
+    def __init__(self, store, cache_size=LAZY_CACHE_SIZE, root=LAZY_ROOT_ID):
+        if cache_size < 1:
+            raise ValueError(f"cache_size must be at least 1: {cache_size}")
+        super().__init__(self, root)
+        self.store = store
+        self.cache_size = cache_size
+        self._resident = OrderedDict()
+        self._dirty = set()
+        if root not in store:
+            self._add(root, {})
+
+    @classmethod
+    def build(cls, store, data, **kwargs):
+        """Write the mapping ``data`` into ``store`` as a new document."""
+        doc = cls(store, **kwargs)
+        doc.clear()
+        doc.update(data)
+        doc.flush()
+        return doc
+
+    @property
+    def resident(self):
+        """The number of nodes currently loaded in memory."""
+        return len(self._resident)
+
+    def flush(self):
+        """Write every changed node back to the store."""
+        for node_id in self._dirty:
+            self.store[node_id] = self._resident[node_id]
+        self._dirty.clear()
+        sync = getattr(self.store, "sync", None)
+        if sync is not None:
+            sync()
+
+    def _load(self, node_id):
+        """Return the node with ``node_id``, loading it if necessary."""
+        try:
+            self._resident.move_to_end(node_id)
+            return self._resident[node_id]
+        except KeyError:
+            pass
+        node = self.store[node_id]
+        self._resident[node_id] = node
+        self._evict()
+        return node
+
+    def _proxy(self, ref):
+        """Return a proxy for the node that ``ref`` refers to."""
+        if isinstance(self._load(ref.id), list):
+            return LazySequence(self, ref.id)
+        return LazyMapping(self, ref.id)
+
+    def _mark_dirty(self, node_id):
+        self._dirty.add(node_id)
+
+    def _encode(self, value):
+        """Prepare ``value`` for storage in a node.
+
+        Dicts and lists (including proxies for them) are stored as new
+        nodes, recursively, and replaced by a ``NodeRef``.
+        """
+        if isinstance(value, LazyNode):
+            value = value.materialize()
+        if isinstance(value, dict):
+            node = {key: self._encode(child) for key, child in value.items()}
+        elif isinstance(value, list):
+            node = [self._encode(child) for child in value]
+        else:
+            return value
+        node_id = uuid.uuid4().hex
+        self._add(node_id, node)
+        return NodeRef(node_id)
+
+    def _drop(self, ref):
+        """Delete the node that ``ref`` refers to and all its descendants."""
+        stack = [ref.id]
+        while stack:
+            node_id = stack.pop()
+            node = self._load(node_id)
+            values = node.values() if isinstance(node, dict) else node
+            stack.extend(v.id for v in values if isinstance(v, NodeRef))
+            del self._resident[node_id]
+            self._dirty.discard(node_id)
+            if node_id in self.store:
+                del self.store[node_id]
+
+    def _materialize(self, ref):
+        """Load the node that ``ref`` refers to as a plain object."""
+        node = self._load(ref.id)
+        if isinstance(node, dict):
+            return {
+                key: self._materialize_value(value)
+                for key, value in node.items()
+            }
+        return [self._materialize_value(value) for value in node]
+
+    def _materialize_value(self, value):
+        if isinstance(value, NodeRef):
+            return self._materialize(value)
+        return value
+
+    def _add(self, node_id, node):
+        self._resident[node_id] = node
+        self._dirty.add(node_id)
+        self._evict()
+
+    def _evict(self):
+        while len(self._resident) > self.cache_size:
+            node_id, node = self._resident.popitem(last=False)
+            if node_id in self._dirty:
+                self.store[node_id] = node
+                self._dirty.discard(node_id)
+
+
+class SQLiteStore(MutableMapping):
+    """A minimal sqlite-backed store for ``LazyDocument`` nodes.
+
+    Nodes are pickled into a single table. Changes are committed on
+    ``sync()`` (which ``LazyDocument.flush()`` calls) and ``close()``.
+
+    Args:
+        filename (str): Path of the database file.
+        table (str): Name of the table to store nodes in.
+    """
+
+    def __init__(self, filename, table="nodes"):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table!r}")
+        self._conn = sqlite3.connect(filename)
+        self._table = table
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}"
+            " (id TEXT PRIMARY KEY, node BLOB NOT NULL)"
+        )
+
+    def __getitem__(self, key):
+        row = self._conn.execute(
+            f"SELECT node FROM {self._table} WHERE id = ?", (key,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key, node):
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (id, node) VALUES (?, ?)",
+            (key, pickle.dumps(node)),
+        )
+
+    def __delitem__(self, key):
+        cursor = self._conn.execute(
+            f"DELETE FROM {self._table} WHERE id = ?", (key,)
+        )
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return (
+            self._conn.execute(
+                f"SELECT 1 FROM {self._table} WHERE id = ?", (key,)
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self):
+        cursor = self._conn.execute(f"SELECT id FROM {self._table}")
+        return (row[0] for row in cursor.fetchall())
+
+    def __len__(self):
+        return self._conn.execute(
+            f"SELECT COUNT(*) FROM {self._table}"
+        ).fetchone()[0]
+
+    def sync(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
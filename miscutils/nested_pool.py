@@ -0,0 +1,124 @@
+"""nested_pool - update nested values in many records over a process pool
+
+``update_many(records, path, transform)`` is ``nested.update()`` for a
+stream of records, spreading a CPU-heavy ``transform`` over a pool of
+worker processes so it isn't held back by the GIL.
+"""
+import copy
+import itertools
+import os
+import pickle
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+
+from miscutils import nested
+
+__all__ = ["update_many"]
+
+# Number of records sent to a worker process at a time by ``update_many``
+UPDATE_CHUNK_SIZE = 1000
+
+
+def update_many(
+    records,
+    path,
+    transform,
+    workers=None,
+    chunksize=UPDATE_CHUNK_SIZE,
+    ordered=True,
+):
+    """Lazily ``update()`` a copy of each record in ``records``.
+
+    Records are sent in chunks of ``chunksize``, together with the compiled
+    path and ``transform``, to a pool of ``workers`` processes. At most two
+    chunks per worker are in flight at a time, so ``records`` can be a
+    generator of any length. Both ``transform`` and the records must be
+    picklable, and ``transform`` must be importable by the workers (e.g. a
+    module-level function rather than a lambda).
+
+    Inputs that fit in a single chunk, or ``workers=1``, are updated in the
+    current process instead, where starting a pool would cost more than it
+    saves. Either way, the records in ``records`` are left unchanged and
+    updated copies are returned.
+
+    Args:
+        records (iterable): Compound data structures to update.
+        path (str): Path to the target property in each record.
+        transform (callable): Called with the target ``DataNode``; its
+            return value replaces the target property.
+        workers (int): Number of worker processes. Defaults to the number
+            of CPUs.
+        chunksize (int): Number of records sent to a worker at a time.
+        ordered (bool): If True, records are returned in input order.
+            Otherwise, each chunk is returned as soon as it completes.
+
+    Returns:
+        An iterator over the updated records.
+
+    Raises:
+        pickle.PicklingError: (Or another error raised by pickling) if
+            ``path`` and ``transform`` can't be sent to the workers.
+
+    Examples:
+        >>> from miscutils.nested_pool import update_many
+        >>> from myapp.transforms import normalize  # importable by workers
+        >>> records = ({'n': i} for i in range(10000))
+        >>> updated = update_many(records, '[n]', normalize, workers=4)
+    """
+    path = nested.compile(path)
+    records = iter(records)
+    first = list(itertools.islice(records, chunksize + 1))
+    if workers == 1 or len(first) <= chunksize:
+        return _update_copies(path, transform, itertools.chain(first, records))
+
+    # Pickle the path and transform once, here, so that an unpicklable
+    # transform raises in the caller rather than in the pool's feeder thread
+    task = pickle.dumps((path, transform))
+    chunks = _chunked(itertools.chain(first, records), chunksize)
+    return _update_parallel(task, chunks, workers, ordered)
+
+
+def _update_copies(path, transform, records):
+    update_record = path.update
+    for record in records:
+        yield update_record(copy.deepcopy(record), transform)
+
+
+def _update_chunk(task, chunk):
+    path, transform = pickle.loads(task)
+    return [path.update(record, transform) for record in chunk]
+
+
+def _update_parallel(task, chunks, workers, ordered):
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers)
+    submit = partial(executor.submit, _update_chunk, task)
+    limit = workers * 2
+    pending = deque()
+
+    try:
+        for chunk in chunks:
+            pending.append(submit(chunk))
+            while len(pending) >= limit:
+                yield from _next_completed(pending, ordered)
+        while pending:
+            yield from _next_completed(pending, ordered)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _next_completed(pending, ordered):
+    """Remove the next (or first finished) future from ``pending``."""
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
@@ -1,7 +1,14 @@
 """views - mutable slices of compound data types"""
-from collections.abc import Iterable, Mapping, MutableMapping, MutableSet, Set
+from collections.abc import (
+    Iterable,
+    Mapping,
+    MutableMapping,
+    MutableSet,
+    Sequence,
+    Set,
+)
 
-__all__ = ["DictView", "SetView"]
+__all__ = ["DictView", "ListView", "SetView"]
 
 
 class DictView(MutableMapping):
@@ -178,3 +185,56 @@ class SetView(MutableSet):
 
     def __eq__(self, other):
         return self.__values == other
+
+
+class ListView(Sequence):
+    """A slice of a sequence that reads and writes through without copying.
+
+    The view covers the indexes ``range(len(obj))[index]``, worked out again
+    on each access, so it follows changes to the length of ``obj``. Items
+    can be replaced through the view, but the view can't change size.
+    """
+
+    def __init__(self, obj: Sequence, index: slice):
+        self.__obj = obj
+        self.__slice = index
+
+    def __str__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+    __repr__ = __str__
+
+    def __indexes(self):
+        return range(len(self.__obj))[self.__slice]
+
+    def __len__(self):
+        return len(self.__indexes())
+
+    def __iter__(self):
+        obj = self.__obj
+        for i in self.__indexes():
+            yield obj[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ListView(self, index)
+        return self.__obj[self.__indexes()[index]]
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            self.__obj[self.__indexes()[index]] = value
+            return
+        indexes = self.__indexes()[index]
+        values = list(value)
+        if len(values) != len(indexes):
+            raise ValueError(
+                f"cannot resize {type(self).__name__}: expected"
+                f" {len(indexes)} values, got {len(values)}"
+            )
+        for i, item in zip(indexes, values):
+            self.__obj[i] = item
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, ListView)):
+            return NotImplemented
+        return list(self) == list(other)
@@ -1,8 +1,15 @@
+import array
+import asyncio
+import copy
+import dataclasses
+import pickle
+from collections import OrderedDict, namedtuple
 from types import SimpleNamespace as Object
 
 import pytest
 
 from miscutils import nested
+from miscutils.views import ListView
 
 
 class Common:
@@ -446,3 +453,1331 @@ class TestUpdate(Common):
     def test_04_object_mixed_validation(self):
         data = self._make_mixed_object()
         self.check_object_mixed_validation(data, nested.update, transform=18)
+
+
+class TestCompile:
+    def test_compiled_path_operations(self):
+        path = nested.compile("[x]#1.y")
+        data = {"x": [None, Object(y=5)]}
+        assert path.get(data) == 5
+        path.set(data, 8)
+        assert data["x"][1].y == 8
+        path.update(data, lambda node: node.value * 2)
+        assert data["x"][1].y == 16
+        path.delete(data)
+        assert not hasattr(data["x"][1], "y")
+
+    def test_compile_accepts_compiled_path(self):
+        path = nested.compile("[x]")
+        assert nested.compile(path) is path
+        assert nested.get({"x": 3}, path) == 3
+
+    def test_cache(self):
+        nested.cache_clear()
+        first = nested.compile("[a][b]")
+        assert nested.compile("[a][b]") is first
+        nested.get({"a": {"b": 1}}, "[a][b]")
+        info = nested.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+        assert info.currsize == 1
+
+    def test_cache_does_not_store_invalid_paths(self):
+        nested.cache_clear()
+        with pytest.raises(nested.MissingRHSOperator):
+            nested.compile("[a")
+        assert nested.cache_info().currsize == 0
+
+    def test_specialized_non_identifier_attrs(self):
+        data = Object(**{"class": Object(**{"a-b": 1})})
+        path = nested.CompiledPath(".class.a-b", threshold=0)
+        assert path.specialized
+        assert path.get(data) == 1
+        path.set(data, 2)
+        assert getattr(data.__dict__["class"], "a-b") == 2
+        path.delete(data)
+        assert not hasattr(data.__dict__["class"], "a-b")
+
+    def test_specialized_set_requires_existing_target(self):
+        path = nested.CompiledPath("[x][y]", threshold=0)
+        with pytest.raises(KeyError):
+            path.set({"x": {}}, 1)
+
+    def test_specializes_after_threshold(self):
+        path = nested.CompiledPath("[x]#0", threshold=3)
+        data = {"x": [1]}
+        assert path.get(data) == 1
+        path.set(data, 2)
+        assert not path.specialized
+        path.update(data, lambda node: node.value + 1)
+        assert path.specialized
+        assert path.get(data) == 3
+        path.delete(data)
+        assert data == {"x": []}
+
+    def test_compile_does_not_specialize_up_front(self):
+        nested.cache_clear()
+        data = {"items": [{"p": i} for i in range(10)]}
+        for i in range(10):
+            assert nested.get(data, f"[items]#{i}[p]") == i
+        assert not nested.compile("[items]#9[p]").specialized
+
+    def test_empty_path(self):
+        path = nested.compile("")
+        data = {"x": 1}
+        assert path.get(data) is data
+        assert path.get_with_context(data) == (data, None, None)
+        with pytest.raises(ValueError):
+            path.set(data, 2)
+
+
+class TestProfiling:
+    @pytest.fixture(autouse=True)
+    def _disable(self):
+        yield
+        nested.disable_profiling()
+
+    def test_interpreted_path_operations(self):
+        path = nested.CompiledPath("[x]#1.y", threshold=None)
+        data = {"x": [None, Object(y=5)]}
+        assert path.get(data) == 5
+        assert path.get(data, default=0) == 5
+        assert path.get_with_context(data).parent is data["x"][1]
+        path.set(data, 8)
+        assert data["x"][1].y == 8
+        path.update(data, lambda node: node.value * 2)
+        assert data["x"][1].y == 16
+        path.delete(data)
+        assert not hasattr(data["x"][1], "y")
+        with pytest.raises(AttributeError):
+            path.set(data, 1)
+        with pytest.raises(ValueError):
+            nested.CompiledPath("", threshold=None).set(data, 1)
+
+    def test_promotes_hot_paths(self):
+        nested.enable_profiling(threshold=3)
+        data = {"a": [{"b": 1}]}
+        for _ in range(2):
+            assert nested.get(data, "[a]#0[b]") == 1
+        assert nested.get(data, "[a]#0[c]", default=0) == 0
+        hot, cold = sorted(nested.stats())
+        assert hot[:3] == ("[a]#0[b]", 2, "interpreted")
+        assert cold[:3] == ("[a]#0[c]", 1, "interpreted")
+        assert hot.time > 0
+
+        nested.set(data, "[a]#0[b]", 5)
+        nested.update(data, "[a]#0[b]", lambda node: node.value + 1)
+        assert nested.get(data, "[a]#0[b]") == 6
+        nested.delete(data, "[a]#0[b]")
+        stats = {entry.path: entry for entry in nested.stats()}
+        assert stats["[a]#0[b]"][1:3] == (6, "specialized")
+        assert data == {"a": [{}]}
+
+    def test_stats_sorted_by_time(self):
+        nested.enable_profiling()
+        compiled = nested.compile("[a]#*")
+        nested.get({"a": []}, "[a]")
+        nested.set({}, "[b]#1[c]", 1, create=True)
+        times = [entry.time for entry in nested.stats()]
+        assert len(times) == 2
+        assert times == sorted(times, reverse=True)
+        nested.get({"a": []}, compiled)
+        assert len(nested.stats()) == 2
+
+    def test_errors_are_recorded(self):
+        nested.enable_profiling()
+        with pytest.raises(KeyError):
+            nested.get({}, "[a]")
+        with pytest.raises(nested.MissingRHSOperator):
+            nested.get({}, "[a")
+        assert [entry[:2] for entry in nested.stats()] == [("[a]", 1)]
+
+    def test_disabled(self):
+        assert nested.stats() == []
+        nested.enable_profiling(threshold=0)
+        nested.get({"a": 1}, "[a]")
+        assert nested.stats()[0][1:3] == (1, "specialized")
+        nested.enable_profiling()
+        assert nested.stats() == []
+        nested.get({"a": 1}, "[a]")
+        nested.disable_profiling()
+        assert nested.stats() == []
+
+
+class TestGetMany:
+    @staticmethod
+    def _make_data():
+        return {
+            "payload": {
+                "user": Object(name="bob", tags=["a", "b"]),
+                "id": 7,
+            }
+        }
+
+    def test_shared_prefixes(self):
+        data = self._make_data()
+        paths = [
+            "[payload][user].name",
+            "[payload][user].tags#1",
+            "[payload][id]",
+            "[payload][user].tags#0",
+        ]
+        assert nested.get_many(data, paths) == ("bob", "b", 7, "a")
+        assert nested.get_many(data, paths, as_dict=True) == {
+            "[payload][user].name": "bob",
+            "[payload][user].tags#1": "b",
+            "[payload][id]": 7,
+            "[payload][user].tags#0": "a",
+        }
+
+    def test_duplicate_and_nested_paths(self):
+        data = self._make_data()
+        paths = ["[payload][id]", "[payload]", "[payload][id]"]
+        assert nested.get_many(data, paths) == (7, data["payload"], 7)
+
+    def test_defaults(self):
+        data = self._make_data()
+        paths = ["[payload][user].age", "[payload][x][y]", "[payload][id]"]
+        assert nested.get_many(data, paths, default=None) == (None, None, 7)
+        assert nested.get_many(
+            data, paths, default=0, defaults={"[payload][x][y]": -1}
+        ) == (0, -1, 7)
+
+    def test_missing_without_default(self):
+        data = self._make_data()
+        with pytest.raises(AttributeError):
+            nested.get_many(data, ["[payload][id]", "[payload][user].age"])
+        with pytest.raises(KeyError):
+            nested.get_many(
+                data,
+                ["[payload][x]", "[payload][y]"],
+                defaults={"[payload][x]": None},
+            )
+
+
+class TestPluck:
+    @staticmethod
+    def _records():
+        yield {"id": 1, "user": {"name": "a"}}
+        yield {"id": 2, "user": {}}
+        yield {"id": 3, "user": {"name": "c"}}
+
+    def test_pluck(self):
+        records = self._records()
+        assert list(nested.pluck(records, "[id]")) == [1, 2, 3]
+
+    def test_pluck_is_lazy(self):
+        records = self._records()
+        names = nested.pluck(records, "[user][name]")
+        assert next(names) == "a"
+        with pytest.raises(KeyError):
+            next(names)
+
+    def test_pluck_default(self):
+        records = self._records()
+        names = nested.pluck(records, "[user][name]", default=None)
+        assert list(names) == ["a", None, "c"]
+
+    def test_pluck_many(self):
+        records = self._records()
+        rows = nested.pluck_many(
+            records, ["[id]", "[user][name]"], defaults={"[user][name]": "-"}
+        )
+        assert list(rows) == [(1, "a"), (2, "-"), (3, "c")]
+
+
+class TestWildcard:
+    @staticmethod
+    def _make_data():
+        return {
+            "items": [
+                {"price": 3, "tags": {"a": 1}},
+                {"price": 5, "tags": {"b": 2, "c": 3}},
+            ],
+            "owner": Object(name="x", id=4),
+        }
+
+    def test_get_is_lazy(self):
+        data = self._make_data()
+        nodes = nested.get(data, "[items]#*[price]")
+        first = next(nodes)
+        assert first.value == 3
+        assert first.action == nested.Action("price", nested.Accessor.KEY)
+        assert first.parent is data["items"][0]
+        assert [node.value for node in nodes] == [5]
+
+    def test_get_fans_out_over_each_accessor(self):
+        data = self._make_data()
+        nodes = nested.get(data, "[items]#*[tags][*]")
+        assert [node.value for node in nodes] == [1, 2, 3]
+        values = [node.value for node in nested.get(data, "[owner].*")]
+        assert sorted(values, key=str) == [4, "x"]
+
+    def test_get_slots(self):
+        class Slotted:
+            __slots__ = ("a", "b")
+
+        obj = Slotted()
+        obj.a = 1
+        assert [node.value for node in nested.get([obj], "#*.*")] == [1]
+        with pytest.raises(TypeError):
+            list(nested.get(5, ".*"))
+
+    def test_compiled_path_is_reusable(self):
+        @dataclasses.dataclass
+        class Record:
+            price: int
+
+        class Slotted:
+            __slots__ = ("price",)
+
+            def __init__(self, price):
+                self.price = price
+
+        path = nested.compile("[items]#*.price")
+        for cls in (Record, Slotted, Object, Record):
+            data = {"items": [cls(price=n) for n in range(3)]}
+            assert [node.value for node in path.get(data)] == [0, 1, 2]
+        with pytest.raises(AttributeError):
+            list(path.get({"items": [Slotted.__new__(Slotted)]}))
+
+    def test_set_and_update(self):
+        data = self._make_data()
+        nested.set(data, "[items]#*[price]", 0)
+        assert [item["price"] for item in data["items"]] == [0, 0]
+        calls = []
+
+        def transform(node):
+            calls.append(node.action.item)
+            return node.value * 10
+
+        nested.update(data, "[items]#*[tags][*]", transform)
+        assert calls == ["a", "b", "c"]
+        assert data["items"][1]["tags"] == {"b": 20, "c": 30}
+
+    def test_delete(self):
+        data = self._make_data()
+        nested.delete(data, "[items]#1[tags][*]")
+        assert data["items"][1]["tags"] == {}
+        nested.delete(data, "[items]#*")
+        assert data["items"] == []
+
+    def test_wildcard_in_get_many(self):
+        with pytest.raises(ValueError):
+            nested.get_many({}, ["[*]"])
+
+
+class TestPathIndex:
+    @staticmethod
+    def _make_data():
+        return {"a": {"b": [1, {"c": 2}]}, "d": Object(e=3)}
+
+    def test_lookup(self):
+        data = self._make_data()
+        index = nested.PathIndex(data)
+        assert index.get("[a][b]#1[c]") == 2
+        assert index.get("[d].e") == 3
+        assert index.get("") is data
+        node = index.get_with_context("[a][b]#0")
+        assert node.value == 1
+        assert node.action == nested.Action(0, nested.Accessor.INDEX)
+        assert node.parent is data["a"]["b"]
+        assert len(index) == 7
+
+    def test_keys_are_parsed_actions(self):
+        index = nested.PathIndex(self._make_data())
+        key = tuple(nested.parse_actions("[a][b]#1"))
+        assert key in index
+        assert "[a][b]#1" in index
+        assert index.get(key) == {"c": 2}
+
+    def test_missing(self):
+        index = nested.PathIndex(self._make_data())
+        with pytest.raises(KeyError):
+            index.get("[a][x]")
+        assert index.get("[a][x]", default=None) is None
+        with pytest.raises(KeyError, match=r"\[a\]\[x\]"):
+            index.set("[a][x]", 1)
+        with pytest.raises(KeyError, match=r"\[a\]\[x\]"):
+            index.delete("[a][x]")
+
+    def test_negative_indexes(self):
+        data = self._make_data()
+        index = nested.PathIndex(data)
+        assert index.get("[a][b]#-1[c]") == nested.get(data, "[a][b]#-1[c]")
+        assert "[a][b]#-2" in index
+        assert "[a][b]#-3" not in index
+        index.delete("[a][b]#-1")
+        assert data["a"]["b"] == [1]
+
+    def test_set_reindexes(self):
+        data = self._make_data()
+        index = nested.PathIndex(data)
+        index.set("[a][b]", {"x": [5]})
+        assert data["a"]["b"] == {"x": [5]}
+        assert index.get("[a][b][x]#0") == 5
+        assert "[a][b]#1[c]" not in index
+
+    def test_delete_reindexes(self):
+        data = self._make_data()
+        index = nested.PathIndex(data)
+        index.delete("[a][b]#0")
+        assert data["a"]["b"] == [{"c": 2}]
+        assert index.get("[a][b]#0[c]") == 2
+        assert "[a][b]#1" not in index
+        index.delete("[a]")
+        assert "a" not in data
+        assert "[a][b]" not in index
+        assert len(index) == 2
+
+    def test_failed_writes_keep_index(self):
+        index = nested.PathIndex({"a": {"b": 1}})
+        with pytest.raises(ValueError):
+            index.set("", 1)
+        with pytest.raises(ValueError):
+            index.delete("")
+        assert len(index) == 2
+
+        index = nested.PathIndex({"a": ({"x": 1}, 2)})
+        with pytest.raises(TypeError):
+            index.set("[a]#0", 1)
+        with pytest.raises(TypeError):
+            index.delete("[a]#0")
+        assert index.get("[a]#0[x]") == 1
+        assert len(index) == 4
+
+
+class TestProjector:
+    def test_projection(self):
+        project = nested.projector(
+            {
+                "user.name": "[in][user].name",
+                "user.tags": {"first": "[in][tags]#0"},
+                "id": "[id]",
+                "copy": "[id]",
+            }
+        )
+        data = {"id": 4, "in": {"user": Object(name="x"), "tags": ["t"]}}
+        assert project(data) == {
+            "user": {"name": "x", "tags": {"first": "t"}},
+            "id": 4,
+            "copy": 4,
+        }
+
+    def test_defaults(self):
+        project = nested.projector(
+            {"a": ("[a]", 0), "b": "[b]", "c": "[c][d]"}, default=None
+        )
+        assert project({"b": 2}) == {"a": 0, "b": 2, "c": None}
+        project = nested.projector({"a": "[a]"})
+        with pytest.raises(KeyError):
+            project({})
+
+    def test_map(self):
+        project = nested.projector({"x": "#1"})
+        assert list(map(project, [[0, 1], [2, 3]])) == [{"x": 1}, {"x": 3}]
+
+    def test_conflicting_keys(self):
+        with pytest.raises(ValueError):
+            nested.projector({"a": "[x]", "a.b": "[y]"})
+        with pytest.raises(ValueError):
+            nested.projector({"a.b": "[x]", "a": "[y]"})
+
+    def test_same_path_different_defaults(self):
+        project = nested.projector({"a": ("[x]", 1), "b": ("[x]", 2)})
+        assert project({}) == {"a": 1, "b": 2}
+
+
+class TestApply:
+    @staticmethod
+    def _make_data():
+        return {"a": {"b": 1, "c": [1, 2, 3]}, "d": Object(e=5)}
+
+    def test_apply(self):
+        data = self._make_data()
+        nested.apply(
+            data,
+            [
+                ("set", "[a][b]", 2),
+                ("update", "[a][c]#0", lambda node: node.value * 10),
+                ("delete", "[a][c]#1"),
+                ("set", "[a][c]#1", 0),
+                ("set", "[a]", {"x": [4]}),
+                ("set", "[a][x]#0", 6),
+                ("delete", "[d].e"),
+            ],
+        )
+        assert data == {"a": {"x": [6]}, "d": Object()}
+
+    def test_apply_wildcards(self):
+        data = self._make_data()
+        nested.apply(
+            data,
+            [
+                ("update", "[a][c]#*", lambda node: -node.value),
+                ("delete", "[a][c]#*"),
+                ("set", "[a][c]", [1]),
+                ("set", "[a][c]#*", 7),
+            ],
+        )
+        assert data["a"] == {"b": 1, "c": [7]}
+
+    def test_rollback(self):
+        data = self._make_data()
+        ops = [
+            ("set", "[a][b]", 2),
+            ("delete", "[a][c]#0"),
+            ("delete", "[a][c]#0"),
+            ("delete", "[d].e"),
+            ("update", "[a]", lambda node: {}),
+            ("set", "[a][missing]", 3),
+        ]
+        with pytest.raises(KeyError):
+            nested.apply(data, ops)
+        assert data == self._make_data()
+
+    def test_rollback_negative_index(self):
+        data = {"a": [1, 2, 3]}
+        with pytest.raises(KeyError):
+            nested.apply(data, [("delete", "[a]#-1"), ("delete", "[nope]")])
+        assert data == {"a": [1, 2, 3]}
+
+    def test_rollback_removes_padding(self):
+        data = {"a": [1]}
+        ops = [("set", "[a]#3", 9), ("set", "[b]", 1), ("delete", "[nope]")]
+        with pytest.raises(KeyError):
+            nested.apply(data, ops, create=True)
+        assert data == {"a": [1]}
+
+    def test_rollback_on_unknown_op(self):
+        data = self._make_data()
+        with pytest.raises(ValueError):
+            nested.apply(data, [("set", "[a][b]", 2), ("merge", "[a]", {})])
+        assert data == self._make_data()
+
+
+class TestPersistent:
+    @staticmethod
+    def _make_data():
+        return {
+            "a": {"b": [1, (2, 3)], "c": {"d": 4}},
+            "e": Object(f=5, g=[6]),
+        }
+
+    def test_assoc_shares_unchanged_subtrees(self):
+        data = self._make_data()
+        new = nested.assoc(data, "[a][b]#1#0", 9)
+        assert data == self._make_data()
+        assert new["a"]["b"] == [1, (9, 3)]
+        assert new["a"] is not data["a"]
+        assert new["a"]["c"] is data["a"]["c"]
+        assert new["e"] is data["e"]
+
+    def test_assoc_attrs(self):
+        data = self._make_data()
+        new = nested.assoc(data, "[e].h", 7)
+        assert new["e"].h == 7
+        assert not hasattr(data["e"], "h")
+        assert new["e"].g is data["e"].g
+
+    def test_assoc_frozen_dataclass(self):
+        @dataclasses.dataclass(frozen=True)
+        class Point:
+            x: int
+            y: int
+
+        data = [Point(1, 2)]
+        new = nested.assoc(data, "#0.y", 5)
+        assert new == [Point(1, 5)]
+        assert data == [Point(1, 2)]
+
+    def test_assoc_namedtuple(self):
+        Pair = namedtuple("Pair", "a b")
+        data = {"p": Pair(1, [2])}
+        new = nested.assoc(data, "[p]#0", 3)
+        assert new["p"] == Pair(3, [2])
+        assert new["p"].b is data["p"].b
+
+    def test_dissoc(self):
+        data = self._make_data()
+        new = nested.dissoc(data, "[a][b]#1#0")
+        assert new["a"]["b"] == [1, (3,)]
+        new = nested.dissoc(data, "[e].f")
+        assert not hasattr(new["e"], "f")
+        assert data == self._make_data()
+        with pytest.raises(KeyError):
+            nested.dissoc(data, "[a][x]")
+
+    def test_update_in(self):
+        data = self._make_data()
+        new = nested.update_in(data, "[a][c][d]", lambda node: node.value + 1)
+        assert new["a"]["c"] == {"d": 5}
+        assert data == self._make_data()
+
+    def test_wildcards_unsupported(self):
+        with pytest.raises(ValueError):
+            nested.assoc({}, "[*]", 1)
+
+
+class TestDefaultsAndExists:
+    @staticmethod
+    def _make_data():
+        return {"a": [1, Object(b={"c": 2})], "s": "xyz"}
+
+    def test_get_default(self):
+        data = self._make_data()
+        assert nested.get(data, "[a]#1.b[c]", default=0) == 2
+        assert nested.get(data, "[a]#1.b[x]", default=0) == 0
+        assert nested.get(data, "[a]#5.b", default=0) == 0
+        assert nested.get(data, "[a]#-3", default=0) == 0
+        assert nested.get(data, "[a]#1.x", default=None) is None
+        assert nested.get(data, "[a]#0[x]", default=0) == 0
+        assert nested.get(data, "[s]#1", default=0) == "y"
+        assert nested.get(data, "[s][x]", default=0) == 0
+
+    def test_get_with_context_default(self):
+        data = self._make_data()
+        node = nested.get_with_context(data, "[a]#1.b[x]", default=0)
+        assert node.value == 0
+        assert node.parent is data["a"][1].b
+        node = nested.get_with_context(data, "[a]#3[x]", default=0)
+        assert node == (0, nested.Action("x", nested.Accessor.KEY), None)
+        node = nested.get_with_context(data, "[a]#0", default=0)
+        assert node == (1, nested.Action(0, nested.Accessor.INDEX), data["a"])
+
+    def test_exists(self):
+        data = self._make_data()
+        report = nested.exists(data, "[a]#1.b[c]")
+        assert report
+        assert report.node.value == 2
+        assert report.depth == 4
+        report = nested.exists(data, "[a]#1.x[c]")
+        assert not report
+        assert report.depth == 2
+        assert report.failed == nested.Action("x", nested.Accessor.ATTR)
+        assert report.node.value is data["a"][1]
+        assert not nested.exists(5, "[a]")
+
+    def test_exists_does_not_raise_internally(self):
+        class Strict(dict):
+            def __getitem__(self, key):
+                raise AssertionError("should use .get()")
+
+        assert not nested.exists({"a": Strict()}, "[a][b]")
+
+    def test_get_default_over_many_types(self):
+        class Items:
+            def __getitem__(self, item):
+                return {"k": 1, 0: 2}[item]
+
+        tuple_type = namedtuple("Pair", "x y")
+        datas = [
+            {"k": [1]},
+            OrderedDict(k=(1,)),
+            nested.track({"k": [1]}),
+            {"k": tuple_type(1, 2)},
+            {"k": "1"},
+            {"k": range(1, 2)},
+        ]
+        # More receiver types than fit in a getter's inline cache
+        datas += [type(f"Dict{i}", (dict,), {})(k=[1]) for i in range(10)]
+        path = nested.compile("[k]#0")
+        for data in datas * 2:
+            assert path.get(data, default=None) in (1, "1")
+            assert path.get(data, default=None) == path.get(data)
+        assert nested.get(Items(), "[k]", default=0) == 1
+        assert nested.get(Items(), "[x]", default=0) == 0
+        assert nested.get(Items(), "#0", default=0) == 2
+        assert nested.get(Items(), "#1", default=0) == 0
+
+
+class TestSetCreate:
+    def test_create_containers(self):
+        data = {}
+        nested.set(data, "[a][b]#2.c", 5, create=True)
+        assert data == {"a": {"b": [None, None, Object(c=5)]}}
+        nested.set(data, "[a][b]#1[d]", 6, create=True)
+        assert data["a"]["b"][1] == {"d": 6}
+        nested.set(data, "[a][b]#2.c", 7, create=True)
+        assert data["a"]["b"][2] == Object(c=7)
+
+    def test_create_pads_sequences(self):
+        data = [1]
+        nested.set(data, "#3", 4, create=True)
+        assert data == [1, None, None, 4]
+        nested.set(data, "#1", 2, create=True)
+        assert data == [1, 2, None, 4]
+
+    def test_create_with_factories(self):
+        data = Object()
+        nested.set(
+            data, ".a[b]#0", 1, create={nested.Accessor.KEY: OrderedDict}
+        )
+        assert isinstance(data.a, OrderedDict)
+        assert data.a == {"b": [1]}
+
+    def test_create_unsupported(self):
+        with pytest.raises(ValueError):
+            nested.set({}, "[*][a]", 1, create=True)
+        with pytest.raises(TypeError):
+            nested.set({"a": 5}, "[a][b]", 1, create=True)
+
+
+class TestParseActions:
+    def test_quoted_and_escaped_params(self):
+        KEY, INDEX = nested.Accessor.KEY, nested.Accessor.INDEX
+        assert nested.parse_actions("[\"a.b\"]['c]d']") == [
+            nested.Action("a.b", KEY),
+            nested.Action("c]d", KEY),
+        ]
+        assert nested.parse_actions(r"[a\.b\]]#-2") == [
+            nested.Action("a.b]", KEY),
+            nested.Action(-2, INDEX),
+        ]
+        assert nested.parse_actions('["*"]') == [nested.Action("*", KEY)]
+        assert nested.get({"a.b": {"#": 1}}, '["a.b"]["#"]') == 1
+
+    def test_errors(self):
+        with pytest.raises(nested.UnterminatedQuote):
+            nested.parse_actions('["a]')
+        with pytest.raises(nested.InvalidIndex):
+            nested.parse_actions("#x")
+        with pytest.raises(ValueError):
+            nested.parse_actions("#1x")
+        with pytest.raises(nested.MissingValueChar):
+            nested.parse_actions("[")
+        for path in ("#1:2:3:4", "#a:", "#,", "#1,,2"):
+            with pytest.raises(nested.InvalidIndex):
+                nested.parse_actions(path)
+        assert nested.parse_actions("[]") == [("", nested.Accessor.KEY)]
+        assert nested.get({"": 1}, "[]") == 1
+
+    def test_format_path_round_trip(self):
+        for path in (
+            "[a]#0.b",
+            '["a.b"]#-1',
+            '["*"][*]#*',
+            '[""].x',
+            "#1:2#::-1#:#3,#1:,-2",
+        ):
+            actions = nested.parse_actions(path)
+            assert nested.format_path(actions) == path
+        actions = nested.parse_actions(r"[a\\b'c]")
+        assert nested.parse_actions(nested.format_path(actions)) == actions
+
+
+class TestSlices:
+    @staticmethod
+    def _make_data():
+        return {
+            "list": list(range(10)),
+            "bytes": b"abcdef",
+            "buffer": bytearray(b"abcdef"),
+            "array": array.array("i", range(6)),
+            "tuple": tuple(range(5)),
+        }
+
+    def test_parse(self):
+        INDEX = nested.Accessor.INDEX
+        assert nested.parse_actions("#10:20#::2#-3:") == [
+            nested.Action(nested.Slice(10, 20), INDEX),
+            nested.Action(nested.Slice(None, None, 2), INDEX),
+            nested.Action(nested.Slice(-3, None), INDEX),
+        ]
+        assert nested.parse_actions('#3,4#"0:2,1"#5,') == [
+            nested.Action((3, 4), INDEX),
+            nested.Action((nested.Slice(0, 2), 1), INDEX),
+            nested.Action((5,), INDEX),
+        ]
+        assert nested.compile("#1:2") == nested.compile("#1:2:")
+        assert hash(nested.compile("#1:2"))
+
+    def test_get_views(self):
+        data = self._make_data()
+        view = nested.get(data, "[list]#2:8:2")
+        assert isinstance(view, ListView)
+        assert view == [2, 4, 6]
+        data["list"][4] = "x"
+        assert view[1] == "x"
+        assert nested.get(data, "[list]#-2:") == [8, 9]
+        assert nested.get(data, "[tuple]#::-2") == [4, 2, 0]
+        for key in ("bytes", "buffer", "array"):
+            view = nested.get(data, f"[{key}]#1:3")
+            assert isinstance(view, memoryview)
+            assert view.obj is data[key]
+            assert view.tolist() == list(data[key][1:3])
+        assert nested.get({"s": "abc"}, "[s]#1:") == "bc"
+
+    def test_get_through_views(self):
+        data = self._make_data()
+        assert nested.get(data, "[list]#2:#1:#0") == 3
+        nodes = nested.get({"a": [{"b": 1}, {"b": 2}, {}]}, "[a]#:2#*[b]")
+        assert [node.value for node in nodes] == [1, 2]
+        assert nested.get(data, "[list]#2:5", default=None) == [2, 3, 4]
+        assert nested.get(5, "#1:2", default=None) is None
+        path = nested.CompiledPath("[list]#1:3", threshold=None)
+        assert path.get(data) == [1, 2]
+
+    def test_set_update_delete(self):
+        data = self._make_data()
+        nested.set(data, "[list]#2:5", ["x"])
+        assert data["list"] == [0, 1, "x", 5, 6, 7, 8, 9]
+        nested.update(data, "[list]#::2", lambda node: [-1] * len(node.value))
+        assert data["list"] == [-1, 1, -1, 5, -1, 7, -1, 9]
+        nested.delete(data, "[list]#1::2")
+        assert data["list"] == [-1, -1, -1, -1]
+        nested.set(data, "[buffer]#0:2", b"XY")
+        nested.set(data, "[array]#::2", array.array("i", [7, 7, 7]))
+        assert data["buffer"] == bytearray(b"XYcdef")
+        assert data["array"].tolist() == [7, 1, 7, 3, 7, 5]
+        nested.set(data, "[new]#0:0", [1, 2], create=True)
+        assert data["new"] == [1, 2]
+
+    def test_update_changes_length(self):
+        data = self._make_data()
+        nested.update(data, "[buffer]#0:2", lambda node: node.value * 2)
+        nested.update(data, "[array]#1:", lambda node: node.value[:1])
+        nested.update(data, "[list]#1:9", lambda node: [])
+        assert data["buffer"] == bytearray(b"ababcdef")
+        assert data["array"].tolist() == [0, 1]
+        assert data["list"] == [0, 9]
+        data = [bytearray(b"abc"), bytearray(b"def")]
+        nested.update(data, "#*#1:", lambda node: b"")
+        assert data == [bytearray(b"a"), bytearray(b"d")]
+
+    def test_write_through_view(self):
+        data = {"a": [0, 1, 2, 3]}
+        view = nested.get(data, "[a]#1:3")
+        nested.set(view, "#0", "x")
+        assert data["a"] == [0, "x", 2, 3]
+        doc = nested.track({"a": [0, 1, 2]})
+        nested.get(doc, "[a]#1:")[0] = "y"
+        assert doc.dirty_paths() == {"[a]#1"}
+
+    def test_tuple_index(self):
+        class Grid:
+            def __init__(self):
+                self.cells = {(0, 0): 1}
+
+            def __getitem__(self, index):
+                return self.cells[index]
+
+            def __setitem__(self, index, value):
+                self.cells[index] = value
+
+            def __delitem__(self, index):
+                del self.cells[index]
+
+        grid = Grid()
+        data = {"grid": grid}
+        assert nested.get(data, "[grid]#0,0") == 1
+        assert nested.get(data, "[grid]#0,1", default=None) is None
+        nested.set(data, "[grid]#0,0", 2)
+        nested.update(data, "[grid]#0,0", lambda node: node.value * 10)
+        assert grid.cells == {(0, 0): 20}
+        nested.delete(data, "[grid]#0,0")
+        assert grid.cells == {}
+
+    def test_apply_rejects_slices(self):
+        data = {"a": [1, 2, 3]}
+        with pytest.raises(ValueError):
+            nested.apply(data, [("set", "[a]#0", 5), ("delete", "[a]#1:")])
+        assert data == {"a": [1, 2, 3]}
+
+
+class TestAsync:
+    class Loader:
+        """In-memory async loader that tracks concurrent loads."""
+
+        def __init__(self):
+            self.active = 0
+            self.peak = 0
+
+        async def load(self, value):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return value
+
+    def _make_data(self, loader):
+        class User:
+            def __init__(self, name):
+                self.name = name
+
+            @property
+            def profile(self):
+                return loader.load({"age": len(self.name)})
+
+        class Root:
+            @property
+            def users(self):
+                return loader.load([User("ann"), User("bo"), User("cy")])
+
+            @property
+            def org(self):
+                return loader.load(Object(title="x"))
+
+        return Root()
+
+    def test_aget(self):
+        loader = self.Loader()
+        data = self._make_data(loader)
+        assert asyncio.run(nested.aget(data, ".users#1.profile[age]")) == 2
+
+    def test_aget_default(self):
+        loader = self.Loader()
+        data = self._make_data(loader)
+        value = asyncio.run(nested.aget(data, ".org.missing", default=0))
+        assert value == 0
+        with pytest.raises(KeyError):
+            asyncio.run(nested.aget({}, "[a]"))
+
+    def test_aget_fan_out_is_concurrent(self):
+        loader = self.Loader()
+        data = self._make_data(loader)
+        nodes = asyncio.run(nested.aget(data, ".users#*.profile[age]"))
+        assert [node.value for node in nodes] == [3, 2, 2]
+        assert loader.peak == 3
+
+    def test_aget_many(self):
+        loader = self.Loader()
+        data = self._make_data(loader)
+        paths = [
+            ".users#0.profile[age]",
+            ".users#2.profile[age]",
+            ".org.title",
+            ".org.missing",
+        ]
+        values = asyncio.run(nested.aget_many(data, paths, default=None))
+        assert values == (3, 2, "x", None)
+        assert loader.peak >= 2
+
+
+class TestDiff:
+    @staticmethod
+    def _make_data():
+        return {
+            "a": {"b": 1, "c": [1, 2, 3], "d": {"x": 1}},
+            "e": Object(f=1, g=[1]),
+            "h": (1, 2),
+            "dotted.key": 0,
+        }
+
+    def _check_round_trip(self, old, new):
+        ops = list(nested.diff(old, new))
+        assert nested.patch(copy.deepcopy(old), ops) == new
+        return ops
+
+    def test_diff(self):
+        old = self._make_data()
+        new = self._make_data()
+        new["a"]["b"] = 2
+        new["a"]["c"] = [1, 5]
+        new["a"]["d"]["y"] = 2
+        new["e"].g.append(2)
+        del new["e"].f
+        new["h"] = (1, 3)
+        new["dotted.key"] = 1
+        ops = self._check_round_trip(old, new)
+        assert sorted(ops, key=str) == sorted(
+            [
+                ("set", "[a][b]", 2),
+                ("delete", "[a][c]#2"),
+                ("set", "[a][c]#1", 5),
+                ("set", "[a][d][y]", 2),
+                ("delete", "[e].f"),
+                ("set", "[e].g#1", 2),
+                ("set", "[h]", (1, 3)),
+                ("set", '["dotted.key"]', 1),
+            ],
+            key=str,
+        )
+
+    def test_deletes_in_key_order(self):
+        old = {key: 1 for key in "zyxwvutsrq"}
+        ops = self._check_round_trip(old, {"z": 1})
+        assert [path for _, path in ops] == [f"[{key}]" for key in "yxwvutsrq"]
+
+    def test_diff_numeric_type_changes(self):
+        old = {"a": 1, "b": 1, "c": [0.0]}
+        new = {"a": True, "b": 1.0, "c": [0]}
+        assert list(nested.diff(old, new)) == [
+            ("set", "[a]", True),
+            ("set", "[b]", 1.0),
+            ("set", "[c]#0", 0),
+        ]
+        patched = nested.patch(old, nested.diff(old, new))
+        assert type(patched["a"]) is bool
+        assert type(patched["b"]) is float
+        assert type(patched["c"][0]) is int
+
+    def test_diff_type_changes(self):
+        old = {"a": [1], "b": {"c": 1}}
+        new = {"a": {"0": 1}, "b": 5}
+        assert self._check_round_trip(old, new) == [
+            ("set", "[a]", {"0": 1}),
+            ("set", "[b]", 5),
+        ]
+
+    def test_diff_skips_shared_subtrees(self):
+        class Exploding(dict):
+            def __eq__(self, other):
+                raise AssertionError("shared subtree was compared")
+
+            __hash__ = None
+
+            def items(self):
+                raise AssertionError("shared subtree was visited")
+
+        shared = Exploding(x=1)
+        old = {"shared": shared, "n": 1}
+        new = {"shared": shared, "n": 2}
+        assert list(nested.diff(old, new)) == [("set", "[n]", 2)]
+        assert list(nested.diff(old, old)) == []
+
+    def test_patch_is_transactional(self):
+        data = {"a": 1}
+        with pytest.raises(KeyError):
+            nested.patch(data, [("set", "[a]", 2), ("set", "[x][y]", 3)])
+        assert data == {"a": 1}
+
+    @pytest.mark.parametrize("old,new", [(1, 2), ({"a": 1}, [1])])
+    def test_diff_root(self, old, new):
+        ops = nested.diff(old, new)
+        assert ops == [("set", "", new)]
+        assert nested.patch(old, ops) == new
+        with pytest.raises(ValueError):
+            nested.apply(old, ops)
+
+    def test_diff_non_string_keys(self):
+        assert nested.diff({1: "a"}, {1: "a"}) == []
+        with pytest.raises(TypeError):
+            nested.diff({"x": 1, 1: "a"}, {"x": 2, 1: "b"})
+
+
+class TestTrack:
+    @staticmethod
+    def _make_data():
+        return {"a": {"b": 1, "c": [1, 2, {"d": 3}]}, "e": Object(f=1)}
+
+    def test_direct_assignment(self):
+        data = self._make_data()
+        doc = nested.track(data)
+        doc["a"]["b"] = 2
+        doc["a"]["c"][2]["d"] = 4
+        doc["e"].f = 2
+        doc["e"].g = 3
+        assert data["a"]["b"] == 2
+        assert data["a"]["c"][2] == {"d": 4}
+        assert data["e"] == Object(f=2, g=3)
+        assert doc.dirty_paths() == {
+            "[a][b]",
+            "[a][c]#2[d]",
+            "[e].f",
+            "[e].g",
+        }
+
+    def test_nested_functions(self):
+        data = self._make_data()
+        doc = nested.track(data)
+        nested.set(doc, "[a][c]#-1[d]", 5)
+        nested.update(doc, "[e].f", lambda node: node.value + 1)
+        nested.delete(doc, "[a][b]")
+        assert data == {"a": {"c": [1, 2, {"d": 5}]}, "e": Object(f=2)}
+        assert doc["a"].dirty_paths() == {"[a][c]#2[d]", "[e].f", "[a][b]"}
+
+    def test_structural_changes(self):
+        doc = nested.track(self._make_data())
+        doc["a"]["c"][2]["d"] = 0
+        doc["a"]["c"].append(4)
+        doc["a"]["c"][0] = 0
+        assert doc.dirty_paths() == {"[a][c]"}
+        doc.mark_clean()
+        assert doc.dirty_paths() == set()
+        doc["a"] = {}
+        doc["a"]["x"] = 1
+        assert doc.dirty_paths() == {"[a]"}
+
+    def test_reads_are_not_recorded(self):
+        doc = nested.track(self._make_data())
+        assert nested.get(doc, "[a][c]#2[d]") == 3
+        assert dict(doc["a"]["c"][2]) == {"d": 3}
+        assert doc["a"]["c"] == [1, 2, {"d": 3}]
+        assert doc.dirty_paths() == set()
+
+
+class TestWalk:
+    @staticmethod
+    def _make_data():
+        return {"a": [1, {"b": 2}], "c": Object(d=3), "e": "xy"}
+
+    def test_depth_first(self):
+        data = self._make_data()
+        nodes = list(nested.walk(data))
+        assert nodes[0] == (data, None, None)
+        assert [node.value for node in nodes[1:]] == [
+            [1, {"b": 2}],
+            1,
+            {"b": 2},
+            2,
+            data["c"],
+            3,
+            "xy",
+        ]
+        assert nodes[3].action == nested.Action(1, nested.Accessor.INDEX)
+        assert nodes[3].parent is data["a"]
+        assert nodes[6].action == nested.Action("d", nested.Accessor.ATTR)
+
+    def test_breadth_first(self):
+        data = self._make_data()
+        nodes = nested.walk(data, order="breadth")
+        assert [node.value for node in nodes][1:] == [
+            [1, {"b": 2}],
+            data["c"],
+            "xy",
+            1,
+            {"b": 2},
+            3,
+            2,
+        ]
+
+    @pytest.mark.parametrize("order", ["depth", "breadth"])
+    def test_prune_and_max_depth(self, order):
+        data = self._make_data()
+        seen = []
+
+        def prune(node):
+            seen.append(node.value)
+            return isinstance(node.value, list)
+
+        nodes = nested.walk(data, order, prune=prune)
+        values = [node.value for node in nodes][1:]
+        assert sorted(values, key=str) == [3, [1, {"b": 2}], data["c"], "xy"]
+        assert len(seen) == 5
+        nodes = nested.walk(data, order, max_depth=1)
+        assert len(list(nodes)) == 4
+        nodes = nested.walk(data, order, max_depth=0)
+        assert list(nodes) == [(data, None, None)]
+        assert list(nested.walk(5, order)) == [(5, None, None)]
+
+    def test_deep_data(self):
+        data = leaf = []
+        for _ in range(10000):
+            leaf.append([])
+            leaf = leaf[0]
+        for order in ("depth", "breadth"):
+            nodes = list(nested.walk(data, order))
+            assert len(nodes) == 10001
+            assert nodes[-1].value is leaf
+
+    def test_invalid_order(self):
+        with pytest.raises(ValueError):
+            nested.walk({}, "sideways")
+
+
+class TestFlatten:
+    def test_flatten(self):
+        data = {
+            "a": {"b": [1, {"c": 2}], "x.y": 3},
+            "e": Object(f=[], g=None),
+            "h": {},
+        }
+        assert list(nested.flatten(data)) == [
+            ("[a][b]#0", 1),
+            ("[a][b]#1[c]", 2),
+            ('[a]["x.y"]', 3),
+            ("[e].f", []),
+            ("[e].g", None),
+            ("[h]", {}),
+        ]
+
+    def test_container_accessor(self):
+        @dataclasses.dataclass
+        class Record:
+            a: int = 0
+
+        ATTR, KEY, INDEX = (
+            nested.Accessor.ATTR,
+            nested.Accessor.KEY,
+            nested.Accessor.INDEX,
+        )
+        cases = [
+            ({}, KEY),
+            (OrderedDict(), KEY),
+            (nested.track({}), KEY),
+            ([], INDEX),
+            ((), INDEX),
+            (range(2), INDEX),
+            (Record(), ATTR),
+            (Object(), ATTR),
+            (Record, None),
+            ("abc", None),
+            (b"abc", None),
+            (1, None),
+        ]
+        for data, accessor in cases * 2:
+            assert nested.container_accessor(data) is accessor
+
+    @pytest.mark.parametrize("data", [1, "abc", {}, []])
+    def test_flatten_leaf(self, data):
+        assert list(nested.flatten(data)) == [("", data)]
+        assert nested.unflatten(nested.flatten(data)) == data
+
+    def test_round_trip(self):
+        data = {
+            "a": [{"b": [1, 2, [3]]}, {}, "x"],
+            "#weird key": {"[1]": Object(c=1)},
+            "": None,
+        }
+        pairs = list(nested.flatten(data))
+        for path, _ in pairs:
+            assert nested.format_path(nested.parse_actions(path)) == path
+        assert nested.unflatten(pairs) == data
+        assert nested.unflatten(dict(pairs)) == data
+
+    def test_deep_documents(self):
+        data = leaf = {}
+        for _ in range(5000):
+            leaf["a"] = leaf = {}
+        leaf["a"] = 1
+        ((path, value),) = nested.flatten(data)
+        assert path == "[a]" * 5001
+        assert value == 1
+
+    def test_unflatten_factories(self):
+        pairs = [("#0.a", 1), ("#1.a", 2)]
+        assert nested.unflatten(pairs) == [Object(a=1), Object(a=2)]
+        create = {nested.Accessor.KEY: OrderedDict}
+        data = nested.unflatten([("[a][b]", 1)], create=create)
+        assert type(data) is type(data["a"]) is OrderedDict
+        assert nested.unflatten([]) is None
+
+
+class TestFilter:
+    @staticmethod
+    def _make_data():
+        return {
+            "orders": [
+                {"id": 1, "status": "open", "total": 5},
+                {"id": 2, "status": "closed", "total": 7},
+                {"id": 3, "status": "open", "total": 9, "tags": ["x"]},
+                {"id": 4, "total": None},
+            ]
+        }
+
+    @pytest.mark.parametrize(
+        "path,expected",
+        [
+            ('[orders][?status=="open"][id]', [1, 3]),
+            ("[orders][?status != 'open'][id]", [2]),
+            ("[orders][?total>=7][id]", [2, 3]),
+            ("[orders][?[tags]#0=='x'][id]", [3]),
+            ("[orders][?tags][id]", [3]),
+            ("[orders][?id in (1, 2)][id]", []),
+            ("[orders]#2[tags][?@=='x']", ["x"]),
+        ],
+    )
+    def test_get(self, path, expected):
+        if "in" in path:
+            with pytest.raises(nested.InvalidFilter):
+                nested.compile(path)
+            return
+        nodes = nested.get(self._make_data(), path)
+        assert [node.value for node in nodes] == expected
+
+    def test_wildcard_and_filter(self):
+        data = {"a": {"x": [1, 5, 9], "y": [7, 2]}}
+        nodes = nested.get(data, "[a][*][?@>4]")
+        assert [(node.action.item, node.value) for node in nodes] == [
+            (1, 5),
+            (2, 9),
+            (0, 7),
+        ]
+
+    @pytest.mark.parametrize(
+        "path,key",
+        [
+            ('[?"my key"==1]', "my key"),
+            ("[?'x<y' == 1]", "x<y"),
+            (r"[?'a\'b'==1]", "a'b"),
+            ('[?"a\\"b"<2]', 'a"b'),
+        ],
+    )
+    def test_quoted_operand(self, path, key):
+        data = [{key: 1}, {key: 2}, {}]
+        assert [node.action.item for node in nested.get(data, path)] == [0]
+
+    def test_misplaced_quote_in_operand(self):
+        with pytest.raises(nested.InvalidFilter):
+            nested.compile('[?a"b"==1]')
+
+    def test_write(self):
+        data = self._make_data()
+        nested.set(data, '[orders][?status=="open"][status]', "done")
+        nested.update(data, "[orders][?total>6][total]", lambda n: n.value * 2)
+        nested.delete(data, "[orders][?total==None]")
+        assert [order["status"] for order in data["orders"]] == [
+            "done",
+            "closed",
+            "done",
+        ]
+        assert [order["total"] for order in data["orders"]] == [5, 14, 18]
+
+    def test_first_stops_early(self):
+        seen = []
+
+        class Orders(list):
+            def __iter__(self):
+                for order in super().__iter__():
+                    seen.append(order["id"])
+                    yield order
+
+        data = {"orders": Orders({"id": n} for n in range(100))}
+        assert nested.first(data, "[orders][?id>2][id]") == 3
+        assert seen == [0, 1, 2, 3]
+
+    def test_first(self):
+        data = self._make_data()
+        assert nested.first(data, "[orders][?total>6][id]") == 2
+        assert nested.first(data, "[orders][?total>60][id]", None) is None
+        assert nested.first(data, "[orders]#0[id]") == 1
+        with pytest.raises(KeyError):
+            nested.first(data, "[orders][?total>60]")
+        with pytest.raises(KeyError):
+            nested.first(data, "[orders][?status=='closed'][tags]")
+
+    def test_first_skips_failed_branches(self):
+        data = {"a": [{}, {"q": 1}], "b": [None, {"c": [2]}]}
+        assert nested.first(data, "[a]#*[q]", default=3) == 1
+        assert nested.first(data, "[a]#*[q]") == 1
+        assert nested.first(data, "[b]#*[c]#0") == 2
+        assert nested.first(data, "[*]#1[c]#0") == 2
+        assert nested.first(data, "[a]#*[x]", default=3) == 3
+
+    def test_format_and_pickle(self):
+        path = "[a][?[b][\"c]\"] == 'x]'].d"
+        actions = nested.parse_actions(path)
+        assert nested.format_path(actions) == path
+        assert pickle.loads(pickle.dumps(actions)) == actions
+
+    def test_keys_starting_with_question_mark(self):
+        actions = [nested.Action("?a", nested.Accessor.KEY)]
+        path = nested.format_path(actions)
+        assert path == '["?a"]'
+        assert nested.parse_actions(path) == actions
+
+        old, new = {"?a": 1, "?b": {"?c": 2}}, {"?a": 5, "?b": {"?c": 3}}
+        assert nested.patch(old, nested.diff(old, new)) == new
+        assert nested.unflatten(nested.flatten(new)) == new
+
+        data = nested.track({"?x": 1})
+        data["?x"] = 2
+        assert data.dirty_paths() == {'["?x"]'}
+
+    @pytest.mark.parametrize(
+        "path", ["[?]", "[?a==]", "[?a==b]", "[?[*]==1]", "[?a==1"]
+    )
+    def test_invalid(self, path):
+        with pytest.raises(nested.Error):
+            nested.parse_actions(path)
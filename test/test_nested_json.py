@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+from miscutils.nested_json import stream_get
+
+
+class TestStreamGet:
+    class Reader:
+        """Binary reader that returns a few bytes at a time."""
+
+        def __init__(self, data, size=3):
+            self.fp = io.BytesIO(data)
+            self.size = size
+
+        def read(self, size=-1):
+            return self.fp.read(self.size)
+
+        @property
+        def consumed(self):
+            return self.fp.tell()
+
+    document = {
+        "skip": {"deep": [1, ']}\\"', {"x": [[], {}]}], "n": -1.5e3},
+        "a": [True, {"b": "café \\"}, None],
+        "c": {"d": 3, "e": [1, 2, 3]},
+        "tail": "x" * 100,
+    }
+
+    def _reader(self, **kwargs):
+        return self.Reader(json.dumps(self.document).encode(), **kwargs)
+
+    def test_stream_get(self):
+        paths = ["[a]#1[b]", "[c]", "[c][e]#2", "[a]#0", "[skip][n]"]
+        assert stream_get(self._reader(), paths) == (
+            "café \\",
+            {"d": 3, "e": [1, 2, 3]},
+            3,
+            True,
+            -1500.0,
+        )
+        values = stream_get(
+            json.dumps(self.document).encode(), ["[a]#2"], as_dict=True
+        )
+        assert values == {"[a]#2": None}
+
+    def test_stops_reading_once_resolved(self):
+        reader = self._reader(size=8)
+        assert stream_get(reader, ["[c][d]"]) == (3,)
+        assert reader.consumed < len(json.dumps(self.document)) - 100
+
+    def test_missing(self):
+        reader = self._reader()
+        with pytest.raises(KeyError):
+            stream_get(reader, ["[a]#5"])
+        values = stream_get(
+            self._reader(),
+            ["[a]#5", "[c][x]", "[tail][x]"],
+            default=0,
+            defaults={"[c][x]": 1},
+        )
+        assert values == (0, 1, 0)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            stream_get(b'{"a": [1, 2', ["[a]#3"])
+        with pytest.raises(ValueError):
+            stream_get(b'{"a": 1}', [".a"])
+        with pytest.raises(ValueError):
+            stream_get(b'{"a": [1]}', ["[a]#-1"])
+        with pytest.raises(ValueError):
+            stream_get(b"[1, 2, 3]", ["#1:3"])
+        with pytest.raises(ValueError):
+            stream_get(b"[1, 2, 3]", ["#0,2"])
@@ -0,0 +1,79 @@
+import pytest
+
+from miscutils import nested
+from miscutils.nested_lazy import LazyDocument, NodeRef, SQLiteStore
+
+
+class TestLazyDocument:
+    @staticmethod
+    def _make_data():
+        return {"a": {"b": [1, {"c": 2}], "d": "x"}, "e": [[1], [2], [3]]}
+
+    def test_get_set_update_delete(self):
+        store = {}
+        doc = LazyDocument.build(store, self._make_data())
+        assert nested.get(doc, "[a][b]#1[c]") == 2
+        assert nested.get(doc, "[e]#-1#0") == 3
+        nested.set(doc, "[a][d]", "y")
+        nested.update(doc, "[a][b]#0", lambda node: node.value + 1)
+        nested.delete(doc, "[e]#1")
+        nested.set(doc, "[f][g]#0", 1, create=True)
+        assert doc.materialize() == {
+            "a": {"b": [2, {"c": 2}], "d": "y"},
+            "e": [[1], [3]],
+            "f": {"g": [1]},
+        }
+
+    def test_nodes_are_stored_separately(self):
+        store = {}
+        LazyDocument.build(store, self._make_data())
+        assert len(store) == 8
+        assert isinstance(store["root"]["a"], NodeRef)
+
+    def test_resident_nodes_are_bounded(self):
+        store = {}
+        data = {"items": [{"n": n} for n in range(50)]}
+        LazyDocument.build(store, data)
+        doc = LazyDocument(store, cache_size=4)
+        for n in range(50):
+            nested.update(doc, f"[items]#{n}[n]", lambda node: node.value * 2)
+            assert doc.resident <= 4
+        doc.flush()
+        reloaded = LazyDocument(store)
+        assert nested.get(reloaded, "[items]#49[n]") == 98
+        assert reloaded == {"items": [{"n": n * 2} for n in range(50)]}
+
+    def test_assigning_containers_with_small_cache(self):
+        store = {}
+        doc = LazyDocument(store, cache_size=1)
+        doc["a"] = {"b": [{"c": 1}, {"d": 2}]}
+        doc["a"]["b"].append([3])
+        doc.flush()
+        assert LazyDocument(store) == {"a": {"b": [{"c": 1}, {"d": 2}, [3]]}}
+
+    def test_cache_size_must_be_positive(self):
+        with pytest.raises(ValueError):
+            LazyDocument({}, cache_size=0)
+
+    def test_replaced_subtrees_are_dropped(self):
+        store = {}
+        doc = LazyDocument.build(store, self._make_data())
+        doc["e"] = 1
+        del doc["a"]
+        doc.flush()
+        assert list(store) == ["root"]
+        assert doc == {"e": 1}
+
+    def test_sqlite_store(self, tmp_path):
+        filename = str(tmp_path / "doc.db")
+        store = SQLiteStore(filename)
+        doc = LazyDocument.build(store, self._make_data())
+        nested.set(doc, "[a][b]#1[c]", 5)
+        doc.flush()
+        store.close()
+
+        store = SQLiteStore(filename)
+        doc = LazyDocument(store, cache_size=2)
+        assert nested.get(doc, "[a][b]#1[c]") == 5
+        assert nested.get_many(doc, ["[a][d]", "[e]#0#0"]) == ("x", 1)
+        store.close()
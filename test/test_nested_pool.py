@@ -0,0 +1,64 @@
+import pickle
+
+import pytest
+
+from miscutils import nested
+from miscutils.nested_pool import update_many
+
+
+def double(node):
+    return node.value * 2
+
+
+class TestUpdateMany:
+    def test_pickle_compiled_path(self):
+        path = nested.compile("[a]#*.b")
+        assert pickle.loads(pickle.dumps(path)) is path
+
+    def test_in_process(self):
+        records = [{"a": [n]} for n in range(5)]
+        updated = list(update_many(records, "[a]#0", double))
+        assert updated == [{"a": [n * 2]} for n in range(5)]
+        assert records == [{"a": [n]} for n in range(5)]
+
+    @pytest.mark.parametrize("ordered", [True, False])
+    def test_process_pool(self, ordered):
+        records = ({"a": [n]} for n in range(100))
+        updated = update_many(
+            records, "[a]#0", double, workers=2, chunksize=7, ordered=ordered
+        )
+        values = [record["a"][0] for record in updated]
+        if not ordered:
+            values.sort()
+        assert values == [n * 2 for n in range(100)]
+
+    def test_process_pool_copies_records(self):
+        records = [{"a": [n]} for n in range(10)]
+        updated = list(
+            update_many(records, "[a]#0", double, workers=2, chunksize=3)
+        )
+        assert updated == [{"a": [n * 2]} for n in range(10)]
+        assert records == [{"a": [n]} for n in range(10)]
+
+    def test_single_chunk_runs_in_process(self):
+        records = [{"n": n} for n in range(10)]
+        updated = update_many(
+            records, "[n]", lambda node: -node.value, workers=2, chunksize=10
+        )
+        assert [record["n"] for record in updated] == [-n for n in range(10)]
+
+    def test_unpicklable_transform(self):
+        records = ({"n": n} for n in range(50))
+        with pytest.raises((pickle.PicklingError, AttributeError)):
+            update_many(
+                records,
+                "[n]",
+                lambda node: -node.value,
+                workers=2,
+                chunksize=10,
+            )
+
+    def test_worker_errors_are_raised(self):
+        records = [{"a": n} for n in range(10)] + [{}]
+        with pytest.raises(KeyError):
+            list(update_many(records, "[a]", double, chunksize=2))
@@ -2,7 +2,7 @@ import copy
 
 import pytest
 
-from miscutils.views import DictView, SetView
+from miscutils.views import DictView, ListView, SetView
 
 
 class TestDictView:
@@ -167,3 +167,53 @@ class TestSetView:
         sview ^= {"baz", "quux", "biff"}
         assert sview == SetView(s, ("foo", "quux"))
         assert s == init_s
+
+
+class TestListView:
+    @pytest.fixture
+    def lst(self):
+        return list(range(10))
+
+    @pytest.fixture
+    def lview(self, lst):
+        return ListView(lst, slice(2, 8, 2))
+
+    def test_copy(self, lview):
+        assert copy.copy(lview) == lview
+        assert copy.deepcopy(lview) == [2, 4, 6]
+
+    def test_get(self, lst, lview):
+        assert len(lview) == 3
+        assert list(lview) == [2, 4, 6]
+        assert lview[0] == 2
+        assert lview[-1] == 6
+        with pytest.raises(IndexError):
+            lview[3]
+        assert lview[::-1] == [6, 4, 2]
+        assert lview == (2, 4, 6)
+        assert lview != [2, 4]
+        assert 4 in lview
+        assert lview.index(6) == 2
+
+        # the view follows changes to the list, including its length
+        lst[4] = "x"
+        assert lview[1] == "x"
+        del lst[5:]
+        assert lview == [2, "x"]
+
+    def test_set(self, lst, lview):
+        lview[0] = "a"
+        lview[1:] = ["b", "c"]
+        assert lst == [0, 1, "a", 3, "b", 5, "c", 7, 8, 9]
+        lview[::-1][0] = "z"
+        assert lst[6] == "z"
+        with pytest.raises(ValueError):
+            lview[1:] = ["b"]
+        with pytest.raises(IndexError):
+            lview[3] = 0
+
+    def test_read_only_sequence(self):
+        tview = ListView((1, 2, 3), slice(1, None))
+        assert tview == [2, 3]
+        with pytest.raises(TypeError):
+            tview[0] = 0